@@ -50,7 +50,7 @@ async def process_chat_interaction(
         # Check if we got a new ad
         latest_ad = chat_client.get_latest_ad()
         if latest_ad:
-            return chat_client.create_context()
+            return chat_client.create_context(latest_ad)
         return None
     except Exception as e:
         logger.error(f"Error processing chat interaction: {e}")
@@ -0,0 +1,118 @@
+"""Example script benchmarking both clients offline against a recorded traffic file.
+
+Record traffic once against the live API (or a staging deployment):
+
+    python replay_benchmark_example.py record traffic.jsonl
+
+Then replay it as often as needed without network access:
+
+    python replay_benchmark_example.py replay traffic.jsonl --timing
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+import sys
+
+sys.path.append("../src")
+
+from adcortex.async_chat_client import AsyncAdcortexChatClient
+from adcortex.chat_client import AdcortexChatClient
+from adcortex.replay import AsyncReplayTransport, RecordingTransport, ReplayTransport
+from adcortex.transports import HttpxTransport
+from adcortex.types import Platform, Role, SessionInfo, UserInfo
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+CONVERSATION = [
+    (Role.user, "I'm looking for a new gaming laptop"),
+    (Role.ai, "What's your budget and preferred screen size?"),
+    (Role.user, "Around $1500 and 15-17 inches"),
+    (Role.ai, "Great! Do you need it for gaming or work?"),
+    (Role.user, "Mostly gaming, but some work too"),
+]
+
+
+def create_session_info() -> SessionInfo:
+    """Create a sample session info object."""
+    return SessionInfo(
+        session_id="14149",
+        character_name="Alex",
+        character_metadata="Friendly and humorous assistant",
+        user_info=UserInfo(
+            user_id="12345",
+            age=20,
+            gender="male",
+            location="US",
+            language="en",
+            interests=["flirting", "gaming"]
+        ),
+        platform=Platform(name="ChatBotX")
+    )
+
+
+def record(path: str) -> None:
+    """Run the sample conversation against the API and record every exchange."""
+    transport = RecordingTransport(HttpxTransport(timeout=5), path)
+    with AdcortexChatClient(session_info=create_session_info(), transport=transport) as chat_client:
+        for role, content in CONVERSATION:
+            chat_client(role=role, content=content)
+    logger.info(f"Recorded traffic to {path}")
+
+
+def replay_sync(path: str, rounds: int, timing: bool) -> None:
+    """Replay recorded traffic through the synchronous client."""
+    chat_client = AdcortexChatClient(
+        session_info=create_session_info(),
+        api_key="replay",
+        disable_logging=True,
+        transport=ReplayTransport(path, timing=timing)
+    )
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for role, content in CONVERSATION:
+            chat_client(role=role, content=content)
+    elapsed = time.perf_counter() - start
+    logger.info(f"sync: {rounds * len(CONVERSATION)} messages in {elapsed:.3f}s")
+
+
+async def replay_async(path: str, rounds: int, timing: bool) -> None:
+    """Replay recorded traffic through the asynchronous client."""
+    chat_client = AsyncAdcortexChatClient(
+        session_info=create_session_info(),
+        api_key="replay",
+        disable_logging=True,
+        transport=AsyncReplayTransport(path, timing=timing)
+    )
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for role, content in CONVERSATION:
+            await chat_client(role=role, content=content)
+    elapsed = time.perf_counter() - start
+    logger.info(f"async: {rounds * len(CONVERSATION)} messages in {elapsed:.3f}s")
+
+
+def main():
+    """Record or replay traffic depending on the command line."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("path")
+    parser.add_argument("--rounds", type=int, default=1000)
+    parser.add_argument("--timing", action="store_true", help="Replay with the recorded latencies")
+    args = parser.parse_args()
+
+    if args.mode == "record":
+        record(args.path)
+    else:
+        replay_sync(args.path, args.rounds, args.timing)
+        asyncio.run(replay_async(args.path, args.rounds, args.timing))
+
+
+if __name__ == "__main__":
+    main()
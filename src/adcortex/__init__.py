@@ -1,14 +1,39 @@
 """ADCortex Python SDK"""
 
-from adcortex.chat_client import AdcortexChatClient
-from adcortex.async_chat_client import AsyncAdcortexChatClient
-from adcortex.types import Ad, Message, SessionInfo, Role
+from importlib import import_module
+from typing import Any
+
+# Public names are resolved on first access so that ``import adcortex`` does not
+# pull in httpx, tenacity or pydantic until they are actually needed.
+_LAZY_ATTRS = {
+    "AdcortexChatClient": "adcortex.chat_client",
+    "AsyncAdcortexChatClient": "adcortex.async_chat_client",
+    "ThreadSafeAdcortexChatClient": "adcortex.threadsafe_chat_client",
+    "SessionInfo": "adcortex.types",
+    "Message": "adcortex.types",
+    "Role": "adcortex.types",
+    "Ad": "adcortex.types",
+}
 
 __all__ = [
     "AdcortexChatClient",
     "AsyncAdcortexChatClient",
+    "ThreadSafeAdcortexChatClient",
     "SessionInfo",
     "Message",
     "Role",
     "Ad"
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module 'adcortex' has no attribute '{name}'")
+    value = getattr(import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(__all__))
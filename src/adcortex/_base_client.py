@@ -0,0 +1,361 @@
+"""Transport-independent behaviour shared by the sync and async chat clients.
+
+:class:`BaseChatClient` owns the queue, breaker, rate limiter and the
+decisions taken before and after a fetch: whether a turn starts one, cache
+lookups, relevance outcomes, latency and debug records and parsing the
+response. The clients in :mod:`adcortex.chat_client` and
+:mod:`adcortex.async_chat_client` only add the I/O around them.
+"""
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Type, TypeVar, Union
+
+import httpx
+from pydantic import ValidationError
+
+from ._env import get_api_key
+from .ad_cache import PersistentAdCache
+from .compression import CompressionStats, RequestEncoder
+from .context import ContextRenderer
+from .core import AdRequestCore, PreparedRequest, RawResponse
+from .debug_log import DebugLog
+from .events import AsyncEventReporter, EventReporter
+from .latency import AdaptiveTimeout
+from .relevance import RelevanceGate
+from .snapshot import dump_state, load_state
+from .state import ClientState, create_circuit_breaker, create_rate_limiter
+from .types import Ad, QueuedMessage, Role, SessionInfo
+
+_ClientT = TypeVar("_ClientT", bound="BaseChatClient")
+
+
+class BaseChatClient:
+    """Queue, breaker and fetch bookkeeping common to every ADCortex chat client.
+
+    Subclasses build the transport, pass the remaining constructor arguments
+    through, and implement sending a batch.
+    """
+
+    # Subclasses log through their own module logger
+    _logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        session_info: SessionInfo,
+        context_template: Optional[str],
+        api_key: Optional[str],
+        timeout: Optional[int],
+        log_level: Optional[int],
+        disable_logging: bool,
+        max_queue_size: int,
+        circuit_breaker_threshold: int,
+        circuit_breaker_timeout: int,
+        compression: Optional[str],
+        compression_threshold: int,
+        rate_limit: Optional[float],
+        rate_limit_burst: Optional[int],
+        shared_state_dir: Optional[str],
+        event_reporter: Optional[Union[EventReporter, AsyncEventReporter]],
+        adaptive_timeout: Optional[AdaptiveTimeout],
+        relevance_gate: Optional[RelevanceGate],
+        debug_log: Optional[DebugLog],
+        context_renderer: Optional[ContextRenderer],
+        ad_cache: Optional[PersistentAdCache],
+    ):
+        self._session_info = session_info
+        self._context_renderer = context_renderer or ContextRenderer(context_template)
+        api_key = get_api_key(api_key)
+        if not api_key:
+            raise ValueError("ADCORTEX_API_KEY is not set and not provided")
+        self._api_key = api_key
+        self._core = AdRequestCore(
+            session_info,
+            self._api_key,
+            RequestEncoder(compression, compression_threshold)
+        )
+        self._event_reporter = event_reporter
+        self._adaptive_timeout = adaptive_timeout
+        self._relevance_gate = relevance_gate
+        self._timeout = timeout
+        self.latest_ad: Optional[Ad] = None
+        self._disable_logging = disable_logging
+        # Per-instance log gates; the shared module logger's configuration is left to the application
+        self._info_enabled = not disable_logging and (log_level is None or log_level <= logging.INFO)
+        self._error_enabled = not disable_logging and (log_level is None or log_level <= logging.ERROR)
+        self._debug_log = debug_log
+        self._ad_cache = ad_cache
+
+        # Queue management
+        self._message_queue: Deque[QueuedMessage] = deque(maxlen=max_queue_size)
+        self._max_queue_size = max_queue_size
+
+        # State management
+        self._state = ClientState.IDLE
+
+        # Circuit breaker and rate limiter, shared across processes when a state directory is given
+        self._circuit_breaker = create_circuit_breaker(
+            threshold=circuit_breaker_threshold,
+            timeout=circuit_breaker_timeout,
+            disable_logging=disable_logging,
+            shared_state_dir=shared_state_dir
+        )
+        self._rate_limiter = create_rate_limiter(rate_limit, rate_limit_burst, shared_state_dir)
+
+    def _log_info(self, message: str, *args: Any) -> None:
+        """Log info message if logging is enabled; arguments are only formatted when emitted."""
+        if self._info_enabled and self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(message, *args)
+
+    def _log_error(self, message: str, *args: Any) -> None:
+        """Log error message if logging is enabled; arguments are only formatted when emitted."""
+        if self._error_enabled and self._logger.isEnabledFor(logging.ERROR):
+            self._logger.error(message, *args)
+
+    def _request_timeout(self) -> Optional[Any]:
+        """Get the timeout for the next request, adapted to recent latency if enabled."""
+        if self._adaptive_timeout is None:
+            return self._timeout
+        return self._adaptive_timeout.timeout_for(self._core.url, self._timeout)
+
+    # Before a fetch
+
+    def _queue_message(self, role: Role, content: str) -> None:
+        """Add a message to the queue; the deque drops the oldest message when full."""
+        current_message = QueuedMessage.create(role, content)
+        if len(self._message_queue) >= self._max_queue_size:
+            self._log_info("Queue full, removed oldest message")
+
+        self._message_queue.append(current_message)
+        self._log_info("Message queued: %s - %s", role, content)
+        if self._debug_log is not None:
+            self._debug_log.record(
+                "message_queued",
+                session_id=self._session_info.session_id,
+                role=current_message.role,
+                chars=len(content),
+            )
+
+    def _fetch_in_flight(self) -> bool:
+        """Whether a fetch started outside the client state is still running."""
+        return False
+
+    def _should_start(self, role: Role) -> bool:
+        """Whether a newly queued message starts a fetch for the queue."""
+        return (
+            self._state == ClientState.IDLE
+            and role == Role.user
+            and not self._fetch_in_flight()
+            and self._ready_to_fetch()
+        )
+
+    def _ready_to_fetch(self) -> bool:
+        """Check the breaker, relevance gate and rate limit for the queued turn."""
+        return not self._circuit_breaker.is_open() and self._worth_fetching() and self._within_rate_limit()
+
+    def _worth_fetching(self) -> bool:
+        """Ask the relevance gate whether the queued turn is worth an ad request."""
+        if self._relevance_gate is None:
+            return True
+        if self._relevance_gate.should_fetch(self._message_queue, self._session_info):
+            return True
+        self._relevance_gate.record_skip()
+        self._log_info("Relevance gate skipped ad fetch for this turn")
+        if self._debug_log is not None:
+            self._debug_log.record("fetch_skipped", session_id=self._session_info.session_id, reason="relevance")
+        return False
+
+    def _within_rate_limit(self) -> bool:
+        """Take a rate limit token; without one the queued messages wait for a later turn."""
+        if self._rate_limiter is None or self._rate_limiter.try_acquire():
+            return True
+        self._log_info("Rate limit reached, deferring ad fetch")
+        if self._debug_log is not None:
+            self._debug_log.record("fetch_skipped", session_id=self._session_info.session_id, reason="rate_limit")
+        return False
+
+    def _fingerprint(self, messages: List[QueuedMessage]) -> Optional[str]:
+        """Return the ad cache key of a batch, or None without an ad cache."""
+        if self._ad_cache is None:
+            return None
+        return self._ad_cache.fingerprint(messages)
+
+    def _serve_cached(self, messages: List[QueuedMessage], fingerprint: Optional[str]) -> bool:
+        """Answer a batch from the ad cache; returns False on a miss."""
+        if self._ad_cache is None or fingerprint is None:
+            return False
+        return self._apply_cached(messages, self._ad_cache.get(self._session_info.session_id, fingerprint))
+
+    def _apply_cached(self, messages: List[QueuedMessage], cached_ad: Optional[Ad]) -> bool:
+        """Use an ad found in the ad cache for a batch; returns False if there was none."""
+        if cached_ad is None:
+            return False
+        self._set_latest_ad(cached_ad)
+        self._log_info("Ad served from cache: %s", cached_ad.ad_title)
+        self._consume_processed(len(messages))
+        return True
+
+    # Around the request
+
+    def _observe_timeout(self, request: PreparedRequest) -> None:
+        """Note a timed-out attempt; the breaker counts the failed turn once, in the batch handler."""
+        self._log_error("Request timed out")
+        if self._adaptive_timeout is not None:
+            self._adaptive_timeout.observe_timeout(request.url, request.timeout)
+
+    def _observe_response(self, request: PreparedRequest, response: RawResponse, start: float) -> None:
+        """Record the latency and debug details of a completed request."""
+        if self._adaptive_timeout is not None:
+            self._adaptive_timeout.observe(request.url, time.perf_counter() - start)
+        if self._debug_log is not None:
+            self._debug_log.record(
+                "response",
+                session_id=self._session_info.session_id,
+                status=response.status_code,
+                seconds=time.perf_counter() - start,
+                request_bytes=len(request.body),
+            )
+
+    def _handle_response(self, response: RawResponse) -> None:
+        """Handle the response from the ad request."""
+        try:
+            parsed_response = self._core.parse_response(response)
+        except ValidationError as e:
+            self._log_error("Invalid ad response format: %s", e)
+            self._circuit_breaker.record_error()
+            return
+        if parsed_response.ads:
+            self._set_latest_ad(parsed_response.ads[0])
+            self._log_info("Ad fetched: %s", parsed_response.ads[0].ad_title)
+        else:
+            self._log_info("No ads returned")
+
+    # After a fetch
+
+    def _complete_batch(self, messages: List[QueuedMessage], previous_ad: Optional[Ad]) -> Optional[Ad]:
+        """Record a fetch's outcome and drop its messages; returns the new ad, if any."""
+        new_ad = self.latest_ad
+        had_ad = new_ad is not None and new_ad is not previous_ad
+        if self._relevance_gate is not None:
+            self._relevance_gate.record_fetch()
+            self._relevance_gate.record_outcome(messages, had_ad)
+        self._consume_processed(len(messages))
+        return new_ad if had_ad else None
+
+    def _cache_ad(self, fingerprint: Optional[str], ad: Optional[Ad]) -> None:
+        """Store a fetched ad in the ad cache, if there is one."""
+        if self._ad_cache is not None and fingerprint is not None and ad is not None:
+            self._ad_cache.put(self._session_info.session_id, fingerprint, ad)
+
+    def _record_batch_error(self, error: Exception) -> None:
+        """Log a failed batch and count it, once, against the circuit breaker."""
+        if isinstance(error, httpx.TimeoutException):
+            self._log_error("Batch request timed out: %s", error)
+        elif isinstance(error, httpx.RequestError):
+            self._log_error("Batch request failed: %s", error)
+        elif isinstance(error, ValidationError):
+            self._log_error("Invalid response format: %s", error)
+        else:
+            self._log_error("Unexpected error processing batch: %s", error)
+        self._circuit_breaker.record_error()
+        if self._relevance_gate is not None:
+            # The request went out even though the turn failed
+            self._relevance_gate.record_fetch()
+
+    def _record_fetch_failure(self, error: Exception) -> None:
+        """Log a fetch that failed after it was counted by the batch handler."""
+        self._log_error("Processing failed: %s", error)
+        if self._debug_log is not None:
+            self._debug_log.record(
+                "fetch_failed",
+                session_id=self._session_info.session_id,
+                error=type(error).__name__,
+            )
+
+    def _consume_processed(self, count: int) -> None:
+        """Only remove messages that were successfully processed."""
+        for _ in range(min(count, len(self._message_queue))):
+            self._message_queue.popleft()
+
+    def _set_latest_ad(self, ad: Ad) -> None:
+        """Store a newly fetched ad."""
+        self.latest_ad = ad
+
+    def _release_state(self) -> None:
+        """Release the shared state files held by the breaker and rate limiter."""
+        self._circuit_breaker.close()
+        if self._rate_limiter is not None:
+            self._rate_limiter.close()
+
+    # Public API
+
+    def create_context(self, latest_ad: Optional[Ad] = None, locale: Optional[str] = None) -> str:
+        """Create a context string for an ad, by default the latest one.
+
+        ``locale`` selects a template from the context renderer and defaults to
+        the user's language. Returns an empty string when there is no ad.
+        """
+        ad = latest_ad if latest_ad is not None else self.latest_ad
+        if ad is None:
+            return ""
+        return self._context_renderer.render(ad, locale or self._session_info.user_info.language)
+
+    def get_latest_ad(self) -> Optional[Ad]:
+        """Get the latest ad and clear it from memory."""
+        latest = self.latest_ad
+        self.latest_ad = None
+        return latest
+
+    def report_impression(self, ad: Ad) -> None:
+        """Record that an ad was shown to the user; does nothing without an event reporter."""
+        if self._event_reporter is not None:
+            self._event_reporter.report_impression(self._session_info.session_id, ad)
+
+    def report_click(self, ad: Ad) -> None:
+        """Record that the user followed an ad link; does nothing without an event reporter."""
+        if self._event_reporter is not None:
+            self._event_reporter.report_click(self._session_info.session_id, ad)
+
+    def export_state(self) -> bytes:
+        """Export the session's queue, latest ad and breaker state as a versioned snapshot."""
+        return dump_state(
+            self._session_info,
+            self._message_queue,
+            self.latest_ad,
+            self._circuit_breaker.export_state()
+        )
+
+    @classmethod
+    def from_state(cls: Type[_ClientT], data: bytes, **kwargs: Any) -> _ClientT:
+        """Create a client from a snapshot made by export_state.
+
+        Keyword arguments are passed to the constructor, e.g. ``api_key`` or ``transport``.
+        """
+        snapshot = load_state(data)
+        client = cls(session_info=snapshot.session_info, **kwargs)
+        client._message_queue.extend(snapshot.messages)
+        client.latest_ad = snapshot.latest_ad
+        if snapshot.circuit_breaker is not None:
+            client._circuit_breaker.restore_state(snapshot.circuit_breaker)
+        return client
+
+    def get_state(self) -> ClientState:
+        """Get current client state."""
+        return self._state
+
+    def get_relevance_stats(self) -> Optional[Dict[str, int]]:
+        """Get fetched and skipped turn counts from the relevance gate, if configured."""
+        if self._relevance_gate is None:
+            return None
+        return self._relevance_gate.get_stats()
+
+    def get_compression_stats(self) -> CompressionStats:
+        """Get request body sizes sent so far and the bytes saved by compression."""
+        return self._core.encoder.stats
+
+    def is_healthy(self) -> bool:
+        """Check if the client is in a healthy state."""
+        return (
+            not self._circuit_breaker.is_open()
+            and len(self._message_queue) < self._max_queue_size
+        )
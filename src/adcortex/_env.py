@@ -0,0 +1,27 @@
+"""On-demand environment loading for ADCortex clients."""
+import os
+from typing import Optional
+
+_dotenv_loaded = False
+
+
+def load_env() -> None:
+    """Load variables from a .env file the first time it is needed."""
+    global _dotenv_loaded
+    if _dotenv_loaded:
+        return
+    _dotenv_loaded = True
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+
+def get_api_key(api_key: Optional[str] = None) -> Optional[str]:
+    """Resolve the API key from the argument, the environment or a .env file."""
+    if api_key:
+        return api_key
+    api_key = os.getenv("ADCORTEX_API_KEY")
+    if api_key:
+        return api_key
+    load_env()
+    return os.getenv("ADCORTEX_API_KEY")
@@ -0,0 +1,218 @@
+"""Persistent on-disk cache of fetched ads for warm restarts.
+
+Ads are appended to a JSON-lines file keyed by session id and a fingerprint
+of the tail of the conversation batch that produced them (by default its
+latest user turn and the AI reply before it), with an absolute expiry time.
+Keying on a bounded tail rather than the whole batch lets a repeated question
+hit the cache even when the earlier queued messages differ, while the AI turn
+keeps short replies such as "yes" from sharing an ad across unrelated
+contexts. The file is read lazily on first use, so a restarted worker can
+answer repeated contexts without calling the API, and it is rewritten in a
+background thread once stale lines outnumber live entries. Use one file per
+process; compaction is not coordinated across processes.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, TextIO, Tuple
+
+from .types import Ad, QueuedMessage, Role
+
+logger = logging.getLogger(__name__)
+
+
+def context_fingerprint(messages: Sequence[QueuedMessage], user_turns: int = 1) -> str:
+    """Hash the tail of a batch, ignoring case and whitespace differences.
+
+    The tail starts at the AI reply preceding the ``user_turns``-th last user
+    message, so the question a short reply answers is part of the key. It
+    covers the whole batch if the batch has fewer user messages.
+    """
+    start = 0
+    seen = 0
+    for index in range(len(messages) - 1, -1, -1):
+        if messages[index].role == Role.user.value:
+            seen += 1
+            if seen == user_turns:
+                start = index
+                break
+    if start > 0 and messages[start - 1].role == Role.ai.value:
+        start -= 1
+    digest = hashlib.sha1()
+    for message in messages[start:]:
+        digest.update(message.role.encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(" ".join(message.content.lower().split()).encode("utf-8"))
+        digest.update(b"\x01")
+    return digest.hexdigest()
+
+
+class PersistentAdCache:
+    """Append-only file cache of ads keyed by session and context fingerprint.
+
+    Args:
+        path: JSON-lines file backing the cache; created if missing.
+        ttl: Seconds a cached ad stays valid, across restarts.
+        max_entries: Live entries kept in memory; the oldest are evicted first.
+        compact_ratio: Compact once the file has this many lines per live entry.
+        min_compact_lines: Never compact files shorter than this.
+        user_turns: Trailing user turns of a batch that make up its cache key,
+            together with the AI reply preceding them.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = 3600,
+        max_entries: int = 10000,
+        compact_ratio: float = 2.0,
+        min_compact_lines: int = 1000,
+        user_turns: int = 1,
+    ):
+        self._path = path
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._compact_ratio = compact_ratio
+        self._min_compact_lines = min_compact_lines
+        self._user_turns = user_turns
+        # key -> (expires_at, ad), oldest first
+        self._entries: "OrderedDict[str, Tuple[float, Ad]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._file: Optional[TextIO] = None
+        self._file_lines = 0
+        self._compacting = False
+        self._written_during_compaction: Optional[List[str]] = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the backing file has been read yet."""
+        return self._file is not None
+
+    def load(self) -> None:
+        """Read the backing file; called automatically on first use."""
+        with self._lock:
+            self._load_locked()
+
+    def _load_locked(self) -> None:
+        if self._file is not None:
+            return
+        now = time.time()
+        if os.path.exists(self._path):
+            with open(self._path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._file_lines += 1
+                    try:
+                        record = json.loads(line)
+                        key, expires_at, ad = record["k"], record["t"], record["ad"]
+                    except (ValueError, KeyError, TypeError):
+                        # A torn last line from a crash mid-write
+                        continue
+                    if expires_at <= now:
+                        self._entries.pop(key, None)
+                        continue
+                    self._entries.pop(key, None)
+                    self._entries[key] = (expires_at, Ad.model_construct(**ad))
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        self._file = open(self._path, "a", encoding="utf-8")
+
+    def fingerprint(self, messages: Sequence[QueuedMessage]) -> str:
+        """Return the cache key of a batch, from its trailing user turns and the AI reply before them."""
+        return context_fingerprint(messages, self._user_turns)
+
+    @staticmethod
+    def _key(session_id: str, fingerprint: str) -> str:
+        return f"{session_id}:{fingerprint}"
+
+    def get(self, session_id: str, fingerprint: str) -> Optional[Ad]:
+        """Return the cached ad for a session and context, or None if missing or expired."""
+        key = self._key(session_id, fingerprint)
+        with self._lock:
+            self._load_locked()
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, session_id: str, fingerprint: str, ad: Ad) -> None:
+        """Cache an ad for a session and context and append it to the file."""
+        key = self._key(session_id, fingerprint)
+        expires_at = time.time() + self._ttl
+        line = json.dumps({"k": key, "t": expires_at, "ad": ad.__dict__}, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._load_locked()
+            self._entries.pop(key, None)
+            self._entries[key] = (expires_at, ad)
+            if len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+            assert self._file is not None
+            self._file.write(line)
+            self._file.flush()
+            self._file_lines += 1
+            if self._written_during_compaction is not None:
+                self._written_during_compaction.append(line)
+            start_compaction = self._should_compact()
+        if start_compaction:
+            threading.Thread(target=self.compact, name="adcortex-ad-cache-compact", daemon=True).start()
+
+    def _should_compact(self) -> bool:
+        if self._compacting or self._file_lines < self._min_compact_lines:
+            return False
+        if self._file_lines < self._compact_ratio * max(1, len(self._entries)):
+            return False
+        self._compacting = True
+        return True
+
+    def compact(self) -> None:
+        """Rewrite the file with only live entries; appends made meanwhile are kept."""
+        with self._lock:
+            self._load_locked()
+            self._compacting = True
+            now = time.time()
+            live = [(key, entry) for key, entry in self._entries.items() if entry[0] > now]
+            self._written_during_compaction = []
+        tmp_path = f"{self._path}.compact"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for key, (expires_at, ad) in live:
+                    f.write(json.dumps({"k": key, "t": expires_at, "ad": ad.__dict__}, separators=(",", ":")) + "\n")
+            with self._lock:
+                with open(tmp_path, "a", encoding="utf-8") as f:
+                    f.writelines(self._written_during_compaction)
+                if self._file is not None:
+                    self._file.close()
+                os.replace(tmp_path, self._path)
+                self._file = open(self._path, "a", encoding="utf-8")
+                self._file_lines = len(live) + len(self._written_during_compaction)
+        except OSError as e:
+            logger.error("Ad cache compaction failed: %s", e)
+        finally:
+            with self._lock:
+                self._written_during_compaction = None
+                self._compacting = False
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get hit and miss counts, live entries and lines in the backing file."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "file_lines": self._file_lines,
+        }
+
+    def close(self) -> None:
+        """Close the backing file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
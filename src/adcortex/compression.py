@@ -0,0 +1,109 @@
+"""Request body compression for ADCortex API requests."""
+import gzip
+import json
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPRESSION_THRESHOLD = 1024  # bytes
+SUPPORTED_ENCODINGS = ("gzip", "zstd")
+
+
+def _zstd_compressor() -> Optional[Callable[[bytes], bytes]]:
+    """Return a zstd compress function if the optional zstandard package is installed."""
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard.ZstdCompressor().compress
+
+
+def accept_encoding() -> str:
+    """Return the Accept-Encoding header value for responses the SDK can decode."""
+    # httpx decodes zstd responses only when zstandard is installed
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return "gzip, deflate"
+    return "gzip, deflate, zstd"
+
+
+class CompressionStats:
+    """Running totals of request body sizes before and after compression."""
+
+    __slots__ = ("requests", "compressed_requests", "raw_bytes", "sent_bytes")
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.compressed_requests = 0
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+
+    def record(self, raw_size: int, sent_size: int, compressed: bool) -> None:
+        """Record the sizes of one request body."""
+        self.requests += 1
+        self.raw_bytes += raw_size
+        self.sent_bytes += sent_size
+        if compressed:
+            self.compressed_requests += 1
+
+    @property
+    def bytes_saved(self) -> int:
+        """Total number of bytes compression kept off the wire."""
+        return self.raw_bytes - self.sent_bytes
+
+    def as_dict(self) -> Dict[str, int]:
+        """Return the stats as a plain dict."""
+        return {
+            "requests": self.requests,
+            "compressed_requests": self.compressed_requests,
+            "raw_bytes": self.raw_bytes,
+            "sent_bytes": self.sent_bytes,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+class RequestEncoder:
+    """Serializes request payloads to JSON and optionally compresses them.
+
+    Bodies smaller than ``threshold`` bytes are sent uncompressed, as the
+    compression overhead outweighs the savings for short conversations.
+    """
+
+    def __init__(
+        self,
+        encoding: Optional[str] = None,
+        threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+    ):
+        if encoding is not None and encoding not in SUPPORTED_ENCODINGS:
+            raise ValueError(
+                f"compression must be one of: {', '.join(SUPPORTED_ENCODINGS)}."
+            )
+        self._compress: Optional[Callable[[bytes], bytes]] = None
+        if encoding == "zstd":
+            self._compress = _zstd_compressor()
+            if self._compress is None:
+                logger.warning("zstandard is not installed, falling back to gzip compression")
+                encoding = "gzip"
+        if encoding == "gzip":
+            self._compress = lambda body: gzip.compress(body, compresslevel=6)
+        self._encoding = encoding
+        self._threshold = threshold
+        self.stats = CompressionStats()
+
+    @property
+    def encoding(self) -> Optional[str]:
+        """The content encoding applied to large bodies, if any."""
+        return self._encoding
+
+    def encode(self, payload: Dict[str, Any]) -> Tuple[bytes, Dict[str, str]]:
+        """Serialize a payload, returning the body and any extra request headers."""
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        if self._compress is None or self._encoding is None or len(body) < self._threshold:
+            self.stats.record(len(body), len(body), compressed=False)
+            return body, {}
+
+        compressed = self._compress(body)
+        self.stats.record(len(body), len(compressed), compressed=True)
+        return compressed, {"Content-Encoding": self._encoding}
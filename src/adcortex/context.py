@@ -0,0 +1,110 @@
+"""Compiled, cached rendering of ad context strings.
+
+Templates use ``str.format`` syntax over :class:`adcortex.types.Ad` fields and
+are parsed once, when they are added to a :class:`ContextRenderer`. Rendering
+reads the fields straight off the ad, without dumping the model, and caches
+the result per template and field values.
+"""
+from functools import lru_cache
+from string import Formatter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .core import DEFAULT_CONTEXT_TEMPLATE
+from .types import Ad
+
+_FORMATTER = Formatter()
+
+
+class _CompiledTemplate:
+    """A template rewritten to positional fields, plus the Ad field read for each."""
+
+    __slots__ = ("template", "fields", "_positional")
+
+    def __init__(self, template: str):
+        fields: List[str] = []
+        pieces: List[str] = []
+        for literal, field_name, format_spec, conversion in _FORMATTER.parse(template):
+            pieces.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field_name is None:
+                continue
+            if field_name not in Ad.model_fields:
+                raise ValueError(f"Context template fields must be Ad field names, got {{{field_name}}}")
+            if format_spec and "{" in format_spec:
+                raise ValueError("Nested fields in context template format specs are not supported")
+            pieces.append("{%d%s%s}" % (
+                len(fields),
+                f"!{conversion}" if conversion else "",
+                f":{format_spec}" if format_spec else "",
+            ))
+            fields.append(field_name)
+
+        self.template = template
+        self.fields: Tuple[str, ...] = tuple(fields)
+        self._positional = "".join(pieces)
+
+    def render_values(self, values: Tuple[str, ...]) -> str:
+        return self._positional.format(*values)
+
+
+class ContextRenderer:
+    """Renders ad context strings from precompiled, optionally per-locale templates.
+
+    Args:
+        template: Default template, used when no locale-specific one matches.
+        locale_templates: Templates keyed by locale, e.g. ``{"de": "..."}``. A
+            locale like ``"pt-BR"`` falls back to ``"pt"``, then to ``template``.
+        cache_size: Number of rendered strings kept in the LRU cache; 0 disables it.
+    """
+
+    def __init__(
+        self,
+        template: Optional[str] = DEFAULT_CONTEXT_TEMPLATE,
+        locale_templates: Optional[Dict[str, str]] = None,
+        cache_size: int = 1024,
+    ):
+        self._default = _CompiledTemplate(template or DEFAULT_CONTEXT_TEMPLATE)
+        self._templates: Dict[str, _CompiledTemplate] = {}
+        self._resolved: Dict[Optional[str], _CompiledTemplate] = {}
+        for locale, locale_template in (locale_templates or {}).items():
+            self.add_template(locale, locale_template)
+        self._render_values: Callable[[_CompiledTemplate, Tuple[str, ...]], str]
+        if cache_size:
+            self._render_values = lru_cache(maxsize=cache_size)(self._render_uncached)
+        else:
+            self._render_values = self._render_uncached
+
+    def add_template(self, locale: str, template: str) -> None:
+        """Compile and register the template for a locale."""
+        self._templates[locale.lower().replace("_", "-")] = _CompiledTemplate(template)
+        self._resolved.clear()
+
+    def _template_for(self, locale: Optional[str]) -> _CompiledTemplate:
+        compiled = self._resolved.get(locale)
+        if compiled is None:
+            compiled = self._default
+            if locale:
+                key = locale.lower().replace("_", "-")
+                compiled = self._templates.get(key) or self._templates.get(key.split("-")[0]) or compiled
+            self._resolved[locale] = compiled
+        return compiled
+
+    @staticmethod
+    def _render_uncached(compiled: _CompiledTemplate, values: Tuple[str, ...]) -> str:
+        return compiled.render_values(values)
+
+    def render(self, ad: Ad, locale: Optional[str] = None) -> str:
+        """Render the context string for an ad in the given locale."""
+        compiled = self._template_for(locale)
+        return self._render_values(compiled, tuple(getattr(ad, field) for field in compiled.fields))
+
+    def render_many(self, ads: Iterable[Ad], locale: Optional[str] = None) -> List[str]:
+        """Render context strings for several ads with one template lookup."""
+        compiled = self._template_for(locale)
+        fields = compiled.fields
+        render_values = self._render_values
+        return [render_values(compiled, tuple(getattr(ad, field) for field in fields)) for ad in ads]
+
+    def cache_info(self) -> Optional[Tuple[int, int, Optional[int], int]]:
+        """Return hit and miss counts of the render cache, or None if caching is disabled."""
+        cache_info = getattr(self._render_values, "cache_info", None)
+        return cache_info() if cache_info is not None else None
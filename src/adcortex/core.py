@@ -0,0 +1,124 @@
+"""Sans-IO request/response core shared by the sync and async ADCortex clients.
+
+The core turns queued messages into request bytes and response bytes into
+parsed ads without doing any I/O itself. Transports in
+:mod:`adcortex.transports` move the bytes.
+"""
+import uuid
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from .compression import RequestEncoder, accept_encoding
+from .types import AdResponse, QueuedMessage, SessionInfo
+
+DEFAULT_CONTEXT_TEMPLATE = "Here is a product the user might like: {ad_title} - {ad_description}: here is a sample way to present it: {placement_template}"
+AD_FETCH_URL = "https://adcortex.3102labs.com/ads/matchv2"
+AD_EVENTS_URL = "https://adcortex.3102labs.com/ads/events"
+
+
+class PreparedRequest:
+    """A fully encoded HTTP request ready to hand to a transport."""
+
+    __slots__ = ("method", "url", "headers", "body", "timeout")
+
+    def __init__(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        body: bytes,
+        timeout: Optional[Any] = None,
+        method: str = "POST",
+    ):
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.body = body
+        self.timeout = timeout
+
+
+class RawResponse:
+    """Status, headers and decoded body bytes returned by a transport."""
+
+    __slots__ = ("status_code", "headers", "content")
+
+    def __init__(
+        self,
+        status_code: int,
+        content: bytes = b"",
+        headers: Optional[Mapping[str, str]] = None,
+    ):
+        self.status_code = status_code
+        self.content = content
+        self.headers = dict(headers or {})
+
+
+class AdcortexHTTPError(Exception):
+    """Raised when the ADCortex API answers with an error status."""
+
+    def __init__(self, response: RawResponse):
+        self.response = response
+        self.status_code = response.status_code
+        super().__init__(f"ADCortex API returned HTTP {response.status_code}")
+
+
+class AdRequestCore:
+    """Builds ad match requests for one session and parses their responses."""
+
+    def __init__(
+        self,
+        session_info: SessionInfo,
+        api_key: str,
+        encoder: Optional[RequestEncoder] = None,
+        url: str = AD_FETCH_URL,
+    ):
+        self._url = url
+        self.encoder = encoder or RequestEncoder()
+        self._headers = {
+            "Content-Type": "application/json",
+            "X-API-KEY": api_key,
+            "Accept-Encoding": accept_encoding(),
+        }
+        self.set_session_info(session_info)
+
+    @property
+    def url(self) -> str:
+        """The ad match endpoint requests are sent to."""
+        return self._url
+
+    def set_session_info(self, session_info: SessionInfo) -> None:
+        """Cache the session part of the payload, which is the same for every request."""
+        session_info_dict = session_info.model_dump()
+        user_info_dict = session_info_dict["user_info"]
+        user_info_dict["interests"] = [interest.value for interest in user_info_dict["interests"]]
+        self._session_fields = {
+            "session_info": {
+                "session_id": session_info_dict["session_id"],
+                "character_name": session_info_dict["character_name"],
+                "character_metadata": session_info_dict["character_metadata"],
+            },
+            "user_data": user_info_dict,
+            "platform": session_info_dict["platform"],
+        }
+
+    def build_payload(self, messages: Iterable[QueuedMessage]) -> Dict[str, Any]:
+        """Build the JSON payload for a batch of queued messages."""
+        fields = self._session_fields
+        return {
+            "RGUID": str(uuid.uuid4()),
+            "session_info": fields["session_info"],
+            "user_data": fields["user_data"],
+            # Roles are already encoded on queued messages
+            "messages": [msg.to_dict() for msg in messages],
+            "platform": fields["platform"],
+        }
+
+    def build_request(self, payload: Dict[str, Any], timeout: Optional[Any] = None) -> PreparedRequest:
+        """Encode a payload into a request for the ad match endpoint."""
+        body, encoding_headers = self.encoder.encode(payload)
+        headers = {**self._headers, **encoding_headers} if encoding_headers else self._headers
+        return PreparedRequest(self._url, headers, body, timeout)
+
+    def parse_response(self, response: RawResponse) -> AdResponse:
+        """Parse a transport response, raising AdcortexHTTPError on error statuses."""
+        if response.status_code >= 400:
+            raise AdcortexHTTPError(response)
+        return AdResponse.model_validate_json(response.content)
@@ -0,0 +1,69 @@
+"""Structured, sampled in-memory event log for debugging ADCortex clients.
+
+Clients record events as an event name plus raw keyword fields. Nothing is
+formatted or written anywhere at record time; entries sit in a bounded ring
+buffer until :meth:`DebugLog.entries` or :meth:`DebugLog.format` is called.
+Clients without a debug log skip recording entirely.
+"""
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+class DebugLog:
+    """Bounded ring buffer of structured client events.
+
+    Args:
+        capacity: Number of most recent entries kept; older ones are overwritten.
+        sample_rate: Fraction of events recorded (0-1), for high-traffic processes.
+        enabled: Recording can be switched on and off at runtime via ``enabled``.
+    """
+
+    def __init__(self, capacity: int = 1000, sample_rate: float = 1.0, enabled: bool = True):
+        self._entries: Deque[Tuple[float, str, Dict[str, Any]]] = deque(maxlen=capacity)
+        self._sample_rate = sample_rate
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self.enabled = enabled
+        self.recorded = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def record(self, event: str, **fields: Any) -> None:
+        """Store an event with its raw fields, subject to sampling."""
+        if not self.enabled:
+            return
+        if self._sample_rate < 1.0 and self._random.random() >= self._sample_rate:
+            return
+        with self._lock:
+            self._entries.append((time.time(), event, fields))
+            self.recorded += 1
+
+    def entries(self, event: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return buffered entries as dicts, oldest first, optionally filtered by event name."""
+        with self._lock:
+            snapshot = list(self._entries)
+        return [
+            {"time": timestamp, "event": name, **fields}
+            for timestamp, name, fields in snapshot
+            if event is None or name == event
+        ]
+
+    def format(self, event: Optional[str] = None) -> str:
+        """Render buffered entries as ``time event key=value`` lines."""
+        lines = []
+        for entry in self.entries(event):
+            timestamp = entry.pop("time")
+            name = entry.pop("event")
+            fields = " ".join(f"{key}={value!r}" for key, value in entry.items())
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+            lines.append(f"{stamp} {name} {fields}".rstrip())
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        """Drop all buffered entries."""
+        with self._lock:
+            self._entries.clear()
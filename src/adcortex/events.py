@@ -0,0 +1,376 @@
+"""Batched impression and click reporting for ADCortex ads.
+
+Reporters buffer events in memory and post them in batches from a background
+thread (:class:`EventReporter`) or asyncio task (:class:`AsyncEventReporter`).
+Recording an event only appends to a bounded buffer, so tracking adds almost
+nothing to the chat path. When the buffer is full the oldest events are
+dropped and counted. Batches that fail with a timeout, a request error, 429
+or 5xx are put back and retried; batches the API rejects with any other 4xx
+are dropped and counted, so they do not hold up the events behind them.
+Closing a reporter flushes whatever is left, and events that still cannot be
+sent, or that are recorded after close, are counted as dropped too.
+"""
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import httpx
+
+from ._env import get_api_key
+from .compression import RequestEncoder
+from .core import AD_EVENTS_URL, AdcortexHTTPError, PreparedRequest, RawResponse
+from .transports import AsyncHttpxTransport, AsyncTransport, HttpxTransport, Transport
+from .types import Ad, AdEventType
+
+logger = logging.getLogger(__name__)
+
+
+class AdEvent:
+    """A single impression or click on an ad."""
+
+    __slots__ = ("event_type", "session_id", "ad_title", "link", "timestamp")
+
+    def __init__(self, event_type: AdEventType, session_id: str, ad: Ad, timestamp: Optional[float] = None):
+        self.event_type = event_type.value
+        self.session_id = session_id
+        self.ad_title = ad.ad_title
+        self.link = ad.link
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the event in its API payload form."""
+        return {
+            "type": self.event_type,
+            "session_id": self.session_id,
+            "ad_title": self.ad_title,
+            "link": self.link,
+            "timestamp": self.timestamp,
+        }
+
+
+class _EventBuffer:
+    """Bounded event buffer and batch encoder shared by both reporters."""
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        url: str,
+        max_buffer_size: int,
+        max_batch_size: int,
+        compression: Optional[str],
+        timeout: Optional[float],
+    ):
+        self._api_key = get_api_key(api_key)
+        if not self._api_key:
+            raise ValueError("ADCORTEX_API_KEY is not set and not provided")
+        self._url = url
+        self._headers = {"Content-Type": "application/json", "X-API-KEY": self._api_key}
+        self._encoder = RequestEncoder(compression)
+        self._timeout = timeout
+        self._events: Deque[AdEvent] = deque()
+        self._lock = threading.Lock()
+        self.max_buffer_size = max_buffer_size
+        self.max_batch_size = max_batch_size
+        self.recorded = 0
+        self.sent = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def add(self, event: AdEvent) -> bool:
+        """Buffer an event; returns True when a full batch is ready to send."""
+        with self._lock:
+            if len(self._events) >= self.max_buffer_size:
+                self._events.popleft()
+                self.dropped += 1
+            self._events.append(event)
+            self.recorded += 1
+            return len(self._events) >= self.max_batch_size
+
+    def reject(self) -> None:
+        """Count an event recorded after the reporter was closed."""
+        with self._lock:
+            self.recorded += 1
+            self.dropped += 1
+
+    def take_batch(self) -> List[AdEvent]:
+        with self._lock:
+            count = min(self.max_batch_size, len(self._events))
+            return [self._events.popleft() for _ in range(count)]
+
+    def put_back(self, batch: List[AdEvent]) -> None:
+        """Return a failed batch to the front of the buffer, dropping what no longer fits."""
+        with self._lock:
+            self.failed_flushes += 1
+            room = self.max_buffer_size - len(self._events)
+            if room < len(batch):
+                self.dropped += len(batch) - max(room, 0)
+                batch = batch[len(batch) - max(room, 0):]
+            self._events.extendleft(reversed(batch))
+
+    def discard(self, batch: List[AdEvent]) -> None:
+        """Drop a batch the API rejected; retrying it would fail the same way."""
+        with self._lock:
+            self.failed_flushes += 1
+            self.dropped += len(batch)
+
+    def drop_all(self) -> int:
+        """Drop every buffered event, returning how many there were."""
+        with self._lock:
+            count = len(self._events)
+            self._events.clear()
+            self.dropped += count
+            return count
+
+    def build_request(self, batch: List[AdEvent]) -> PreparedRequest:
+        body, encoding_headers = self._encoder.encode({"events": [event.to_dict() for event in batch]})
+        return PreparedRequest(self._url, {**self._headers, **encoding_headers}, body, self._timeout)
+
+    def mark_sent(self, response: RawResponse, batch: List[AdEvent]) -> None:
+        if response.status_code >= 400:
+            raise AdcortexHTTPError(response)
+        with self._lock:
+            self.sent += len(batch)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "recorded": self.recorded,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "failed_flushes": self.failed_flushes,
+            "buffered": len(self._events),
+        }
+
+
+# Errors that leave a batch unsent
+_SEND_ERRORS = (httpx.TimeoutException, httpx.RequestError, AdcortexHTTPError)
+
+
+def _retryable(error: Exception) -> bool:
+    """Whether a failed batch may succeed later: timeouts, request errors, 429 and 5xx."""
+    if isinstance(error, AdcortexHTTPError):
+        return error.status_code == 429 or error.status_code >= 500
+    return True
+
+
+def _settle_failed(buffer: _EventBuffer, batch: List[AdEvent], error: Exception) -> bool:
+    """Put a failed batch back if it can be retried, else drop it; returns False if put back."""
+    if _retryable(error):
+        logger.warning("Event flush failed, will retry: %s", error)
+        buffer.put_back(batch)
+        return False
+    logger.error("Dropping %d ad events rejected by the API: %s", len(batch), error)
+    buffer.discard(batch)
+    return True
+
+
+class EventReporter:
+    """Buffers ad events and posts them in batches from a background thread.
+
+    A batch is sent when ``max_batch_size`` events are buffered or every
+    ``flush_interval`` seconds, whichever comes first. :meth:`close` (also run
+    at interpreter exit) stops the thread and flushes the remaining events.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        transport: Optional[Transport] = None,
+        url: str = AD_EVENTS_URL,
+        max_batch_size: int = 100,
+        flush_interval: float = 5.0,
+        max_buffer_size: int = 10000,
+        compression: Optional[str] = None,
+        timeout: Optional[float] = 5,
+        shutdown_attempts: int = 3,
+    ):
+        self._buffer = _EventBuffer(api_key, url, max_buffer_size, max_batch_size, compression, timeout)
+        self._transport = transport or HttpxTransport(timeout=timeout)
+        self._flush_interval = flush_interval
+        self._shutdown_attempts = shutdown_attempts
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def record(self, event_type: AdEventType, session_id: str, ad: Ad) -> None:
+        """Buffer one event for the next batch."""
+        if self._stopped:
+            self._buffer.reject()
+            return
+        if self._thread is None:
+            self._start()
+        if self._buffer.add(AdEvent(event_type, session_id, ad)):
+            self._wakeup.set()
+
+    def report_impression(self, session_id: str, ad: Ad) -> None:
+        """Record that an ad was shown."""
+        self.record(AdEventType.impression, session_id, ad)
+
+    def report_click(self, session_id: str, ad: Ad) -> None:
+        """Record that an ad link was followed."""
+        self.record(AdEventType.click, session_id, ad)
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="adcortex-events", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self) -> None:
+        while not self._stopped:
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _send_batch(self) -> bool:
+        """Send one batch; returns False if it failed and was put back for a retry."""
+        batch = self._buffer.take_batch()
+        if not batch:
+            return True
+        try:
+            response = self._transport.send(self._buffer.build_request(batch))
+            self._buffer.mark_sent(response, batch)
+        except _SEND_ERRORS as e:
+            return _settle_failed(self._buffer, batch, e)
+        return True
+
+    def flush(self) -> None:
+        """Send all buffered events now, stopping at the first failed batch."""
+        while self._buffer:
+            if not self._send_batch():
+                return
+
+    def close(self) -> None:
+        """Stop the background thread and flush the remaining events."""
+        if self._stopped:
+            return
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        attempts = 0
+        while self._buffer and attempts < self._shutdown_attempts:
+            if not self._send_batch():
+                attempts += 1
+        dropped = self._buffer.drop_all()
+        if dropped:
+            logger.error("Dropping %d ad events that could not be sent on shutdown", dropped)
+        self._transport.close()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get counts of recorded, sent, dropped and buffered events."""
+        return self._buffer.stats()
+
+
+class AsyncEventReporter:
+    """Buffers ad events and posts them in batches from a background asyncio task.
+
+    Recording is synchronous and never awaits; the flush task is started on
+    the running loop with the first event recorded inside one. Call :meth:`aclose` on shutdown to
+    flush the remaining events.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        transport: Optional[AsyncTransport] = None,
+        url: str = AD_EVENTS_URL,
+        max_batch_size: int = 100,
+        flush_interval: float = 5.0,
+        max_buffer_size: int = 10000,
+        compression: Optional[str] = None,
+        timeout: Optional[float] = 5,
+        shutdown_attempts: int = 3,
+    ):
+        self._buffer = _EventBuffer(api_key, url, max_buffer_size, max_batch_size, compression, timeout)
+        self._transport = transport or AsyncHttpxTransport(timeout=timeout)
+        self._flush_interval = flush_interval
+        self._shutdown_attempts = shutdown_attempts
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopped = False
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, event_type: AdEventType, session_id: str, ad: Ad) -> None:
+        """Buffer one event for the next batch."""
+        if self._stopped:
+            self._buffer.reject()
+            return
+        if self._task is None:
+            self._start()
+        if self._buffer.add(AdEvent(event_type, session_id, ad)) and self._wakeup is not None:
+            self._wakeup.set()
+
+    def report_impression(self, session_id: str, ad: Ad) -> None:
+        """Record that an ad was shown."""
+        self.record(AdEventType.impression, session_id, ad)
+
+    def report_click(self, session_id: str, ad: Ad) -> None:
+        """Record that an ad link was followed."""
+        self.record(AdEventType.click, session_id, ad)
+
+    def _start(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No running loop: keep buffering until an event is recorded on one, or aclose flushes
+            return
+        wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run(wakeup))
+        self._wakeup = wakeup
+
+    async def _run(self, wakeup: asyncio.Event) -> None:
+        while not self._stopped:
+            try:
+                await asyncio.wait_for(wakeup.wait(), self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
+            await self.flush()
+
+    async def _send_batch(self) -> bool:
+        """Send one batch; returns False if it failed and was put back for a retry."""
+        batch = self._buffer.take_batch()
+        if not batch:
+            return True
+        try:
+            response = await self._transport.send(self._buffer.build_request(batch))
+            self._buffer.mark_sent(response, batch)
+        except _SEND_ERRORS as e:
+            return _settle_failed(self._buffer, batch, e)
+        return True
+
+    async def flush(self) -> None:
+        """Send all buffered events now, stopping at the first failed batch."""
+        while self._buffer:
+            if not await self._send_batch():
+                return
+
+    async def aclose(self) -> None:
+        """Stop the background task and flush the remaining events."""
+        if self._stopped:
+            return
+        self._stopped = True
+        if self._task is not None and self._wakeup is not None:
+            self._wakeup.set()
+            await self._task
+        attempts = 0
+        while self._buffer and attempts < self._shutdown_attempts:
+            if not await self._send_batch():
+                attempts += 1
+        dropped = self._buffer.drop_all()
+        if dropped:
+            logger.error("Dropping %d ad events that could not be sent on shutdown", dropped)
+        await self._transport.aclose()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get counts of recorded, sent, dropped and buffered events."""
+        return self._buffer.stats()
@@ -0,0 +1,106 @@
+"""Latency tracking and adaptive request timeouts for ADCortex clients."""
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+import httpx
+
+
+class LatencyTracker:
+    """Streaming percentile estimate over a sliding window of recent latencies.
+
+    Percentiles are recomputed from the window at most every
+    ``refresh_every`` samples, so recording stays O(1) on the hot path.
+    """
+
+    def __init__(self, window: int = 512, refresh_every: int = 16):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._refresh_every = refresh_every
+        self._since_refresh = 0
+        self._sorted: Optional[list] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, latency: float) -> None:
+        """Add one latency sample in seconds."""
+        with self._lock:
+            self._samples.append(latency)
+            self._since_refresh += 1
+            if self._since_refresh >= self._refresh_every:
+                self._sorted = None
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the ``q`` quantile (0-1) of the window, or None without samples."""
+        with self._lock:
+            if not self._samples:
+                return None
+            if self._sorted is None:
+                self._sorted = sorted(self._samples)
+                self._since_refresh = 0
+            index = min(len(self._sorted) - 1, max(0, math.ceil(q * len(self._sorted)) - 1))
+            return self._sorted[index]
+
+
+class AdaptiveTimeout:
+    """Derives per-endpoint timeouts from observed latency percentiles.
+
+    Once ``min_samples`` requests to an endpoint have completed, its connect
+    and read timeouts become ``multiplier`` times the recent ``percentile``
+    latency, clamped to ``[min_timeout, max_timeout]``. Timed-out requests are
+    recorded at the timeout they hit, so the estimate backs off instead of
+    spiralling down during an incident. One instance can be shared by many
+    clients.
+    """
+
+    def __init__(
+        self,
+        multiplier: float = 3.0,
+        percentile: float = 0.99,
+        min_timeout: float = 0.25,
+        max_timeout: float = 10.0,
+        min_samples: int = 20,
+        window: int = 512,
+    ):
+        self._multiplier = multiplier
+        self._percentile = percentile
+        self._min_timeout = min_timeout
+        self._max_timeout = max_timeout
+        self._min_samples = min_samples
+        self._window = window
+        self._trackers: Dict[str, LatencyTracker] = {}
+
+    def _tracker(self, endpoint: str) -> LatencyTracker:
+        tracker = self._trackers.get(endpoint)
+        if tracker is None:
+            tracker = self._trackers.setdefault(endpoint, LatencyTracker(self._window))
+        return tracker
+
+    def current(self, endpoint: str) -> Optional[float]:
+        """Return the adaptive timeout in seconds, or None while warming up."""
+        tracker = self._tracker(endpoint)
+        if len(tracker) < self._min_samples:
+            return None
+        percentile = tracker.percentile(self._percentile)
+        if percentile is None:
+            return None
+        value = percentile * self._multiplier
+        return min(self._max_timeout, max(self._min_timeout, value))
+
+    def timeout_for(self, endpoint: str, default: Optional[float]) -> Optional[httpx.Timeout]:
+        """Return the httpx timeout for the next request to ``endpoint``."""
+        value = self.current(endpoint)
+        if value is None:
+            return None if default is None else httpx.Timeout(default)
+        return httpx.Timeout(value, connect=value, read=value)
+
+    def observe(self, endpoint: str, latency: float) -> None:
+        """Record the latency of a completed request."""
+        self._tracker(endpoint).record(latency)
+
+    def observe_timeout(self, endpoint: str, timeout: Optional[httpx.Timeout]) -> None:
+        """Record a timed-out request at the read timeout it was given."""
+        if timeout is not None and timeout.read is not None:
+            self._tracker(endpoint).record(timeout.read)
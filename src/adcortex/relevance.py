@@ -0,0 +1,169 @@
+"""Local relevance gates that decide whether a turn is worth an ad fetch.
+
+A gate runs before the client processes its queue. Turns it rejects keep
+their messages queued, so their context still goes out with the next fetch.
+"""
+import re
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+from .types import Interest, QueuedMessage, Role, SessionInfo
+
+# Words suggesting an ad could match, seeded per Interest category
+INTEREST_KEYWORDS: Dict[Interest, FrozenSet[str]] = {
+    Interest.flirting: frozenset({"date", "dating", "romance", "romantic", "flirt", "love", "gift", "flowers", "perfume", "anniversary"}),
+    Interest.gaming: frozenset({"game", "games", "gaming", "console", "controller", "steam", "xbox", "playstation", "nintendo", "headset", "keyboard", "mouse"}),
+    Interest.sports: frozenset({"sport", "sports", "gym", "workout", "fitness", "running", "shoes", "football", "soccer", "basketball", "tennis", "bike"}),
+    Interest.music: frozenset({"music", "song", "songs", "album", "concert", "headphones", "speaker", "guitar", "piano", "playlist"}),
+    Interest.travel: frozenset({"travel", "trip", "flight", "flights", "hotel", "vacation", "holiday", "beach", "luggage", "booking"}),
+    Interest.technology: frozenset({"phone", "tech", "laptop", "computer", "app", "software", "gadget", "camera", "smartwatch", "tablet"}),
+    Interest.art: frozenset({"art", "paint", "painting", "drawing", "sketch", "design", "canvas", "museum", "craft"}),
+    Interest.cooking: frozenset({"cook", "cooking", "recipe", "kitchen", "food", "bake", "baking", "dinner", "restaurant", "meal"}),
+}
+
+# Words signalling purchase intent regardless of interests
+INTENT_KEYWORDS: FrozenSet[str] = frozenset({
+    "buy", "buying", "price", "budget", "recommend", "recommendation", "cheap",
+    "deal", "deals", "best", "shop", "shopping", "looking", "need", "want", "under",
+})
+
+# Replies that almost never produce a useful ad
+LOW_SIGNAL_REPLIES: FrozenSet[str] = frozenset({
+    "ok", "okay", "k", "lol", "lmao", "haha", "hahaha", "yes", "yeah", "yep", "no",
+    "nope", "thanks", "thank you", "thx", "cool", "nice", "sure", "hmm", "hi", "hello",
+    "hey", "bye", "good night", "gn", "same", "true", "wow", "idk",
+})
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+class RelevanceGate:
+    """Base class for gates deciding whether a turn should trigger an ad fetch.
+
+    Subclasses implement :meth:`should_fetch`. Clients count rejected turns
+    with :meth:`record_skip` and, once an ad request has actually been sent,
+    count it with :meth:`record_fetch`, so turns held back by the rate limit,
+    the scheduler or the ad cache are not reported as fetched. One gate may be
+    shared by many clients and threads.
+    """
+
+    def __init__(self) -> None:
+        self.fetched = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def should_fetch(self, messages: Sequence[QueuedMessage], session_info: SessionInfo) -> bool:
+        """Return True if the queued conversation is worth an ad request."""
+        return True
+
+    def record_outcome(self, messages: Sequence[QueuedMessage], had_ad: bool) -> None:
+        """Learn from the result of a fetch; the default gate ignores it."""
+
+    def record_skip(self) -> None:
+        """Count a turn the gate rejected."""
+        with self._lock:
+            self.skipped += 1
+
+    def record_fetch(self) -> None:
+        """Count a turn whose ad request was sent."""
+        with self._lock:
+            self.fetched += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get the number of fetched and skipped turns."""
+        return {"fetched": self.fetched, "skipped": self.skipped}
+
+
+def _latest_user_text(messages: Sequence[QueuedMessage]) -> Optional[str]:
+    for message in reversed(messages):
+        if message.role == Role.user.value:
+            return message.content
+    return None
+
+
+class HeuristicRelevanceGate(RelevanceGate):
+    """Cheap length and keyword heuristics over the latest user message.
+
+    A turn is fetched when the latest user message contains an intent word or
+    a keyword for one of the session's interests. Otherwise it is skipped if
+    it is a known low-signal reply or shorter than ``min_chars`` /
+    ``min_words``. With ``learn`` enabled, short replies whose past fetches
+    returned no ad at least ``empty_rate_threshold`` of the time (over
+    ``min_observations`` fetches) are skipped as well.
+    """
+
+    def __init__(
+        self,
+        min_chars: int = 12,
+        min_words: int = 3,
+        extra_keywords: Optional[Iterable[str]] = None,
+        learn: bool = True,
+        learn_max_words: int = 4,
+        min_observations: int = 20,
+        empty_rate_threshold: float = 0.95,
+        max_learned_phrases: int = 10000,
+    ):
+        super().__init__()
+        self._min_chars = min_chars
+        self._min_words = min_words
+        self._extra_keywords = frozenset(k.lower() for k in extra_keywords or ())
+        self._learn = learn
+        self._learn_max_words = learn_max_words
+        self._min_observations = min_observations
+        self._empty_rate_threshold = empty_rate_threshold
+        self._max_learned_phrases = max_learned_phrases
+        # phrase -> [fetches, fetches that returned no ad]
+        self._outcomes: Dict[str, List[int]] = {}
+        self._keyword_cache: Dict[FrozenSet[Interest], FrozenSet[str]] = {}
+
+    def _keywords_for(self, interests: Iterable[Interest]) -> FrozenSet[str]:
+        key = frozenset(interests)
+        keywords = self._keyword_cache.get(key)
+        if keywords is None:
+            selected = INTEREST_KEYWORDS.keys() if Interest.all in key or not key else key
+            keywords = INTENT_KEYWORDS | self._extra_keywords
+            keywords = keywords.union(*(INTEREST_KEYWORDS[i] for i in selected if i in INTEREST_KEYWORDS))
+            self._keyword_cache[key] = keywords
+        return keywords
+
+    def should_fetch(self, messages: Sequence[QueuedMessage], session_info: SessionInfo) -> bool:
+        """Fetch on keywords or prices; skip short, low-signal or learned empty replies."""
+        text = _latest_user_text(messages)
+        if text is None:
+            return False
+        lowered = text.lower()
+        words = _WORD_RE.findall(lowered)
+        if "$" in lowered or not self._keywords_for(session_info.user_info.interests).isdisjoint(words):
+            return True
+
+        phrase = " ".join(words)
+        if phrase in LOW_SIGNAL_REPLIES:
+            return False
+        if len(lowered.strip()) < self._min_chars or len(words) < self._min_words:
+            return False
+        with self._lock:
+            outcome = self._outcomes.get(phrase)
+            if outcome is not None and outcome[0] >= self._min_observations:
+                return outcome[1] / outcome[0] < self._empty_rate_threshold
+        return True
+
+    def record_outcome(self, messages: Sequence[QueuedMessage], had_ad: bool) -> None:
+        """Learn how often a short reply's fetches come back without an ad."""
+        if not self._learn:
+            return
+        text = _latest_user_text(messages)
+        if text is None:
+            return
+        words = _WORD_RE.findall(text.lower())
+        if not words or len(words) > self._learn_max_words:
+            return
+        phrase = " ".join(words)
+        with self._lock:
+            outcome = self._outcomes.get(phrase)
+            if outcome is None:
+                if len(self._outcomes) >= self._max_learned_phrases:
+                    return
+                outcome = self._outcomes[phrase] = [0, 0]
+            outcome[0] += 1
+            if not had_ad:
+                outcome[1] += 1
@@ -0,0 +1,195 @@
+"""Record-and-replay transports for offline benchmarking of ADCortex clients.
+
+Recording transports wrap another transport and append every exchange to a
+JSON-lines file: the request body, the response status and body, and the
+observed latency. Replay transports feed those responses back in order,
+optionally sleeping for the recorded latency, so the clients can be profiled
+against production-shaped traffic without touching the live API.
+"""
+import asyncio
+import base64
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .core import PreparedRequest, RawResponse
+from .transports import AsyncTransport, Transport
+
+# Record kinds for failed exchanges, replayed as the matching httpx exception
+_TIMEOUT = "timeout"
+_REQUEST_ERROR = "request_error"
+
+
+class ReplayExhausted(Exception):
+    """Raised when a non-looping replay runs out of recorded exchanges."""
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+class _Recorder:
+    """Appends exchange records to a file, one JSON object per line."""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = threading.Lock()
+
+    def write(
+        self,
+        request: PreparedRequest,
+        latency: float,
+        response: Optional[RawResponse] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        record: Dict[str, Any] = {
+            "ts": round(time.time(), 3),
+            "latency": round(latency, 6),
+            "url": request.url,
+            "encoding": request.headers.get("Content-Encoding"),
+            "request": _b64(request.body),
+        }
+        if error is not None:
+            record["error"] = error
+        elif response is not None:
+            record["status"] = response.status_code
+            record["response"] = _b64(response.content)
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock, open(self._path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class RecordingTransport(Transport):
+    """Wraps a transport and records every exchange it makes."""
+
+    def __init__(self, transport: Transport, path: str):
+        """Record exchanges made through ``transport`` to the JSON-lines file at ``path``."""
+        self._transport = transport
+        self._recorder = _Recorder(path)
+
+    def send(self, request: PreparedRequest) -> RawResponse:
+        """Send a request through the wrapped transport and record the exchange."""
+        start = time.perf_counter()
+        try:
+            response = self._transport.send(request)
+        except httpx.TimeoutException:
+            self._recorder.write(request, time.perf_counter() - start, error=_TIMEOUT)
+            raise
+        except httpx.RequestError:
+            self._recorder.write(request, time.perf_counter() - start, error=_REQUEST_ERROR)
+            raise
+        self._recorder.write(request, time.perf_counter() - start, response)
+        return response
+
+    def close(self) -> None:
+        """Close the wrapped transport."""
+        self._transport.close()
+
+
+class AsyncRecordingTransport(AsyncTransport):
+    """Async counterpart of :class:`RecordingTransport`."""
+
+    def __init__(self, transport: AsyncTransport, path: str):
+        """Record exchanges made through ``transport`` to the JSON-lines file at ``path``."""
+        self._transport = transport
+        self._recorder = _Recorder(path)
+
+    async def send(self, request: PreparedRequest) -> RawResponse:
+        """Send a request through the wrapped transport and record the exchange."""
+        start = time.perf_counter()
+        try:
+            response = await self._transport.send(request)
+        except httpx.TimeoutException:
+            self._recorder.write(request, time.perf_counter() - start, error=_TIMEOUT)
+            raise
+        except httpx.RequestError:
+            self._recorder.write(request, time.perf_counter() - start, error=_REQUEST_ERROR)
+            raise
+        self._recorder.write(request, time.perf_counter() - start, response)
+        return response
+
+    async def aclose(self) -> None:
+        """Close the wrapped transport."""
+        await self._transport.aclose()
+
+
+def load_recording(path: str) -> List[Dict[str, Any]]:
+    """Read all exchange records from a recording file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class _Player:
+    """Hands out recorded exchanges in order, optionally looping."""
+
+    def __init__(self, path: str, loop: bool):
+        self._path = path
+        self._loop = loop
+        self._records: Optional[List[Dict[str, Any]]] = None
+        self._position = 0
+        self._lock = threading.Lock()
+
+    def next(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._records is None:
+                self._records = load_recording(self._path)
+            if self._position >= len(self._records):
+                if not self._loop or not self._records:
+                    raise ReplayExhausted(f"No more recorded exchanges in {self._path}")
+                self._position = 0
+            record = self._records[self._position]
+            self._position += 1
+            return record
+
+
+def _to_response(record: Dict[str, Any]) -> RawResponse:
+    error = record.get("error")
+    if error == _TIMEOUT:
+        raise httpx.ReadTimeout("Recorded request timed out")
+    if error == _REQUEST_ERROR:
+        raise httpx.ConnectError("Recorded request failed")
+    return RawResponse(record["status"], base64.b64decode(record["response"]))
+
+
+class ReplayTransport(Transport):
+    """Answers requests with recorded responses instead of calling the API.
+
+    Args:
+        path: Recording file written by :class:`RecordingTransport`.
+        timing: Sleep for each exchange's recorded latency before answering.
+        speed: Divides recorded latencies when ``timing`` is enabled.
+        loop: Start over from the first record when the recording runs out.
+    """
+
+    def __init__(self, path: str, timing: bool = False, speed: float = 1.0, loop: bool = True):
+        """Replay the recording at ``path``; see the class docstring for the options."""
+        self._player = _Player(path, loop)
+        self._timing = timing
+        self._speed = speed
+
+    def send(self, request: PreparedRequest) -> RawResponse:
+        """Return the next recorded response, re-raising recorded failures."""
+        record = self._player.next()
+        if self._timing:
+            time.sleep(record["latency"] / self._speed)
+        return _to_response(record)
+
+
+class AsyncReplayTransport(AsyncTransport):
+    """Async counterpart of :class:`ReplayTransport`."""
+
+    def __init__(self, path: str, timing: bool = False, speed: float = 1.0, loop: bool = True):
+        """Replay the recording at ``path``; see :class:`ReplayTransport` for the options."""
+        self._player = _Player(path, loop)
+        self._timing = timing
+        self._speed = speed
+
+    async def send(self, request: PreparedRequest) -> RawResponse:
+        """Return the next recorded response, re-raising recorded failures."""
+        record = self._player.next()
+        if self._timing:
+            await asyncio.sleep(record["latency"] / self._speed)
+        return _to_response(record)
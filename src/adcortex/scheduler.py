@@ -0,0 +1,126 @@
+"""Priority-aware scheduling of async ad fetches under a global in-flight limit."""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+
+from .latency import LatencyTracker
+from .types import SessionInfo
+
+
+class FetchShed(Exception):
+    """Raised when a fetch is dropped from the scheduler queue under backpressure."""
+
+
+class FetchScheduler:
+    """Limits concurrent ad fetches and admits waiting fetches by priority.
+
+    At most ``max_in_flight`` fetches run at once. Others wait in per-priority
+    FIFO queues, and higher priorities are admitted first. When
+    ``max_queue_size`` fetches are already waiting, the oldest waiter of the
+    lowest priority class is shed with :class:`FetchShed`, even when the new
+    fetch has that same priority. Only a new fetch of strictly lower priority
+    than every waiter is shed itself instead.
+
+    Priorities are integers (higher is more important), resolved from
+    ``Platform.varient`` through ``priorities`` unless a client overrides them.
+    One scheduler should be shared by all async clients on an event loop.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 10,
+        max_queue_size: int = 1000,
+        priorities: Optional[Dict[str, int]] = None,
+        default_priority: int = 0,
+    ):
+        self._max_in_flight = max_in_flight
+        self._max_queue_size = max_queue_size
+        self._priorities = priorities or {}
+        self._default_priority = default_priority
+        self._in_flight = 0
+        self._queued = 0
+        self._waiters: Dict[int, Deque[Tuple[float, asyncio.Future]]] = {}
+        self._queue_wait = LatencyTracker()
+        self._shed = 0
+
+    def priority_for(self, session_info: SessionInfo) -> int:
+        """Resolve the priority class of a session from its platform variant."""
+        return self._priorities.get(session_info.platform.varient, self._default_priority)
+
+    @asynccontextmanager
+    async def slot(self, priority: int) -> AsyncIterator[None]:
+        """Wait for an in-flight slot, holding it for the body of the block."""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, priority: int) -> None:
+        """Wait for an in-flight slot; raises FetchShed if dropped while queued."""
+        if self._in_flight < self._max_in_flight and not self._queued:
+            self._in_flight += 1
+            self._queue_wait.record(0.0)
+            return
+
+        if self._queued >= self._max_queue_size:
+            self._shed_lowest(priority)
+
+        enqueued = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(priority, deque()).append((enqueued, future))
+        self._queued += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # The slot was handed over just as we were cancelled
+                self.release()
+            else:
+                self._discard(priority, future)
+            raise
+        self._queue_wait.record(time.monotonic() - enqueued)
+
+    def release(self) -> None:
+        """Return a slot, handing it to the highest-priority waiter if any."""
+        for priority in sorted(self._waiters, reverse=True):
+            waiters = self._waiters[priority]
+            while waiters:
+                _, future = waiters.popleft()
+                self._queued -= 1
+                if not future.done():
+                    future.set_result(None)
+                    return
+        self._in_flight -= 1
+
+    def _shed_lowest(self, incoming_priority: int) -> None:
+        lowest = min((p for p, waiters in self._waiters.items() if waiters), default=None)
+        self._shed += 1
+        if lowest is None or lowest > incoming_priority:
+            raise FetchShed("Fetch scheduler queue is full")
+        _, future = self._waiters[lowest].popleft()
+        self._queued -= 1
+        if not future.done():
+            future.set_exception(FetchShed("Shed by higher-priority fetch under backpressure"))
+
+    def _discard(self, priority: int, future: asyncio.Future) -> None:
+        waiters = self._waiters.get(priority)
+        if not waiters:
+            return
+        for entry in waiters:
+            if entry[1] is future:
+                waiters.remove(entry)
+                self._queued -= 1
+                return
+
+    def get_stats(self) -> Dict[str, Optional[float]]:
+        """Get in-flight and queued counts, shed count and queue-wait percentiles in seconds."""
+        return {
+            "in_flight": self._in_flight,
+            "queued": self._queued,
+            "shed": self._shed,
+            "queue_wait_p50": self._queue_wait.percentile(0.5),
+            "queue_wait_p99": self._queue_wait.percentile(0.99),
+        }
@@ -0,0 +1,187 @@
+"""Hosting many chat sessions with idle hibernation and a memory budget.
+
+:class:`SessionPool` keeps one client per session id. Sessions idle for longer
+than ``idle_timeout`` are hibernated: their state is exported as a snapshot
+(see :mod:`adcortex.snapshot`) and the client is dropped. If the resident
+sessions still exceed ``max_resident_bytes``, the least recently used ones are
+hibernated too. The next :meth:`SessionPool.get` for a hibernated session
+rehydrates it transparently, so resident memory tracks active sessions.
+"""
+import hashlib
+import os
+import sys
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Type
+
+from . import async_chat_client, chat_client
+from .async_chat_client import AsyncAdcortexChatClient
+from .chat_client import AdcortexChatClient
+from .state import ClientState
+from .transports import (
+    AsyncHttpxTransport,
+    AsyncUnixSocketTransport,
+    HttpxTransport,
+    UnixSocketTransport,
+)
+from .types import SessionInfo
+
+
+def estimate_footprint(client: Any) -> int:
+    """Roughly estimate the memory held by a client's per-session state, in bytes."""
+    size = sys.getsizeof(client._message_queue)
+    for message in client._message_queue:
+        size += sys.getsizeof(message) + sys.getsizeof(message.content)
+    if client.latest_ad is not None:
+        size += sys.getsizeof(client.latest_ad) + sum(
+            sys.getsizeof(value) for value in client.latest_ad.__dict__.values()
+        )
+    session_info = client._session_info
+    size += sys.getsizeof(session_info) + sys.getsizeof(session_info.character_metadata)
+    size += sys.getsizeof(session_info.user_info) + sys.getsizeof(session_info.user_info.interests)
+    return size
+
+
+def _shared_transport(client_class: Type, client_kwargs: Dict[str, Any]) -> Any:
+    """Build the transport a pool shares, as a single client would build its own."""
+    is_async = issubclass(client_class, AsyncAdcortexChatClient)
+    sidecar_path = client_kwargs.get("sidecar_path")
+    if sidecar_path:
+        return AsyncUnixSocketTransport(sidecar_path) if is_async else UnixSocketTransport(sidecar_path)
+    default_timeout = async_chat_client.DEFAULT_TIMEOUT if is_async else chat_client.DEFAULT_TIMEOUT
+    timeout = client_kwargs.get("timeout", default_timeout)
+    return AsyncHttpxTransport(timeout=timeout) if is_async else HttpxTransport(timeout=timeout)
+
+
+class SessionPool:
+    """Keeps per-session clients resident only while they are in use.
+
+    Args:
+        client_class: ``AdcortexChatClient`` or ``AsyncAdcortexChatClient``.
+        idle_timeout: Seconds without activity before a session is hibernated.
+        max_resident_bytes: Budget for the estimated footprint of resident sessions.
+        storage_dir: Directory for hibernated snapshots; kept in memory, compressed, if None.
+        maintain_every: Run :meth:`maintain` automatically every this many :meth:`get` calls.
+        **client_kwargs: Passed to every client. Unless a ``transport`` is given,
+            the pool creates one pooled transport shared by all its clients,
+            connected to ``sidecar_path`` if one is given.
+    """
+
+    def __init__(
+        self,
+        client_class: Type = AdcortexChatClient,
+        idle_timeout: float = 300,
+        max_resident_bytes: Optional[int] = None,
+        storage_dir: Optional[str] = None,
+        maintain_every: int = 100,
+        **client_kwargs: Any,
+    ):
+        self._client_class = client_class
+        self._idle_timeout = idle_timeout
+        self._max_resident_bytes = max_resident_bytes
+        self._storage_dir = storage_dir
+        self._maintain_every = maintain_every
+        self._owns_transport = "transport" not in client_kwargs
+        if self._owns_transport:
+            client_kwargs["transport"] = _shared_transport(client_class, client_kwargs)
+        self._client_kwargs = client_kwargs
+        # session_id -> (client, last used), least recently used first
+        self._resident: "OrderedDict[str, list]" = OrderedDict()
+        self._hibernated: Dict[str, Optional[bytes]] = {}
+        self._calls = 0
+        self.hibernations = 0
+        self.rehydrations = 0
+        if storage_dir:
+            os.makedirs(storage_dir, exist_ok=True)
+
+    def get(self, session_info: SessionInfo) -> Any:
+        """Return the client for a session, creating or rehydrating it as needed."""
+        session_id = session_info.session_id
+        entry = self._resident.get(session_id)
+        if entry is not None:
+            entry[1] = time.monotonic()
+            self._resident.move_to_end(session_id)
+        else:
+            if session_id in self._hibernated:
+                client = self._client_class.from_state(self._load(session_id), **self._client_kwargs)
+                self.rehydrations += 1
+            else:
+                client = self._client_class(session_info=session_info, **self._client_kwargs)
+            entry = self._resident[session_id] = [client, time.monotonic()]
+
+        self._calls += 1
+        if self._maintain_every and self._calls % self._maintain_every == 0:
+            self.maintain()
+        return entry[0]
+
+    def maintain(self) -> None:
+        """Hibernate idle sessions, then least recently used ones until under budget."""
+        cutoff = time.monotonic() - self._idle_timeout
+        for session_id, (client, last_used) in list(self._resident.items()):
+            if last_used > cutoff:
+                break
+            self.hibernate(session_id)
+
+        if self._max_resident_bytes is None:
+            return
+        footprints = {sid: estimate_footprint(entry[0]) for sid, entry in self._resident.items()}
+        total = sum(footprints.values())
+        for session_id in list(self._resident):
+            if total <= self._max_resident_bytes:
+                break
+            if self.hibernate(session_id):
+                total -= footprints[session_id]
+
+    def hibernate(self, session_id: str) -> bool:
+        """Snapshot a resident session and drop its client; busy sessions are skipped."""
+        entry = self._resident.get(session_id)
+        if entry is None or entry[0].get_state() != ClientState.IDLE:
+            return False
+        self._store(session_id, entry[0].export_state())
+        del self._resident[session_id]
+        self.hibernations += 1
+        return True
+
+    def _path(self, session_id: str) -> str:
+        assert self._storage_dir is not None
+        name = hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+        return os.path.join(self._storage_dir, f"{name}.snapshot")
+
+    def _store(self, session_id: str, data: bytes) -> None:
+        if self._storage_dir:
+            with open(self._path(session_id), "wb") as f:
+                f.write(data)
+            self._hibernated[session_id] = None
+        else:
+            self._hibernated[session_id] = zlib.compress(data)
+
+    def _load(self, session_id: str) -> bytes:
+        stored = self._hibernated.pop(session_id)
+        if stored is not None:
+            return zlib.decompress(stored)
+        path = self._path(session_id)
+        with open(path, "rb") as f:
+            data = f.read()
+        os.remove(path)
+        return data
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get resident and hibernated session counts and the resident footprint."""
+        return {
+            "resident": len(self._resident),
+            "hibernated": len(self._hibernated),
+            "resident_bytes": sum(estimate_footprint(entry[0]) for entry in self._resident.values()),
+            "hibernations": self.hibernations,
+            "rehydrations": self.rehydrations,
+        }
+
+    def close(self) -> None:
+        """Close the pool's shared transport, if it created one."""
+        if self._owns_transport:
+            self._client_kwargs["transport"].close()
+
+    async def aclose(self) -> None:
+        """Async counterpart of :meth:`close` for pools of async clients."""
+        if self._owns_transport:
+            await self._client_kwargs["transport"].aclose()
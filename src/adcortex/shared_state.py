@@ -0,0 +1,200 @@
+"""Cross-process circuit breaker and rate limiter state for ADCortex clients.
+
+State lives in small memory-mapped files so every worker process on a host
+sees the same breaker and rate-limit budget. Read-modify-write updates are
+serialized with an advisory ``flock`` on the file, plus a thread lock for
+threads within one process. Each state file is opened once per process and
+shared by every client using it; it is closed when the last one is closed
+or garbage collected. POSIX only.
+"""
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BREAKER_FILE_NAME = "circuit_breaker.state"
+RATE_LIMITER_FILE_NAME = "rate_limiter.state"
+
+
+class _SharedRecord:
+    """Fixed-layout record in a memory-mapped file guarded by an advisory lock."""
+
+    def __init__(self, path: str, fmt: str):
+        self._struct = struct.Struct(fmt)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < self._struct.size:
+            os.ftruncate(self._fd, self._struct.size)
+        self._mmap = mmap.mmap(self._fd, self._struct.size)
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold the record exclusively across processes and threads."""
+        with self._thread_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def read(self) -> Tuple[Any, ...]:
+        return self._struct.unpack_from(self._mmap, 0)
+
+    def write(self, *values: Any) -> None:
+        self._struct.pack_into(self._mmap, 0, *values)
+
+    def close(self) -> None:
+        self._mmap.close()
+        os.close(self._fd)
+
+
+# (pid, path, format) -> [record, reference count]. Keyed by pid so a forked
+# child opens its own descriptors: flock does not exclude processes sharing one.
+_records: Dict[Tuple[int, str, str], List[Any]] = {}
+_records_lock = threading.Lock()
+
+
+def _acquire_record(path: str, fmt: str) -> Tuple[_SharedRecord, Tuple[int, str, str]]:
+    """Return this process's record for a state file, opening it on first use."""
+    key = (os.getpid(), os.path.realpath(path), fmt)
+    with _records_lock:
+        entry = _records.get(key)
+        if entry is None:
+            entry = _records[key] = [_SharedRecord(path, fmt), 0]
+        entry[1] += 1
+        return entry[0], key
+
+
+def _release_record(key: Tuple[int, str, str]) -> None:
+    """Drop one reference to a record, closing it when none are left."""
+    with _records_lock:
+        entry = _records.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del _records[key]
+            entry[0].close()
+
+
+class SharedCircuitBreaker:
+    """Circuit breaker whose state is shared by every process using the same file.
+
+    Has the same interface as :class:`adcortex.state.CircuitBreaker`; a trip
+    recorded by one worker opens the breaker for all of them.
+    """
+
+    # error_count, reset_at (wall clock seconds, 0.0 while closed)
+    _FORMAT = "<qd"
+
+    def __init__(
+        self,
+        path: str,
+        threshold: int = 5,
+        timeout: int = 120,  # 2 minutes
+        disable_logging: bool = False
+    ):
+        self._record, key = _acquire_record(path, self._FORMAT)
+        self._finalizer = weakref.finalize(self, _release_record, key)
+        self._threshold = threshold
+        self._timeout = timeout
+        self._disable_logging = disable_logging
+
+    def _log_error(self, message: str) -> None:
+        """Log error message if logging is enabled."""
+        if not self._disable_logging:
+            logger.error(message)
+
+    def record_error(self) -> None:
+        """Record an error and update circuit breaker state."""
+        with self._record.locked():
+            error_count, reset_at = self._record.read()
+            error_count += 1
+            opened = error_count >= self._threshold and not reset_at
+            if opened:
+                reset_at = time.time() + self._timeout
+            self._record.write(error_count, reset_at)
+        if opened:
+            self._log_error("Shared circuit breaker opened due to too many errors")
+
+    def is_open(self) -> bool:
+        """Check if circuit breaker is open and update state if needed."""
+        with self._record.locked():
+            _, reset_at = self._record.read()
+            if not reset_at:
+                return False
+            if time.time() >= reset_at:
+                self._record.write(0, 0.0)
+                return False
+            return True
+
+    def reset(self) -> None:
+        """Reset the circuit breaker state."""
+        with self._record.locked():
+            self._record.write(0, 0.0)
+
+    def export_state(self) -> None:
+        """Shared state already outlives the process, so there is nothing to export."""
+        return None
+
+    def restore_state(self, state: Optional[dict]) -> None:
+        """Shared state is restored from the state file, so snapshots are ignored."""
+
+    def close(self) -> None:
+        """Release this instance's reference to the shared state file."""
+        self._finalizer()
+
+
+class SharedRateLimiter:
+    """Token bucket rate limiter whose budget is shared across processes.
+
+    Has the same interface as :class:`adcortex.state.RateLimiter`.
+    """
+
+    # initialized flag, tokens, last update (wall clock seconds)
+    _FORMAT = "<?dd"
+
+    def __init__(
+        self,
+        path: str,
+        rate: float,
+        burst: Optional[int] = None
+    ):
+        self._record, key = _acquire_record(path, self._FORMAT)
+        self._finalizer = weakref.finalize(self, _release_record, key)
+        self._rate = rate
+        self._capacity = float(burst if burst is not None else max(1, int(rate)))
+
+    def _take(self, only_if_available: bool) -> float:
+        with self._record.locked():
+            initialized, tokens, updated = self._record.read()
+            now = time.time()
+            if not initialized:
+                tokens, updated = self._capacity, now
+            tokens = min(self._capacity, tokens + max(0.0, now - updated) * self._rate)
+            if only_if_available and tokens < 1:
+                self._record.write(True, tokens, now)
+                return (1 - tokens) / self._rate
+            tokens -= 1
+            self._record.write(True, tokens, now)
+        return 0.0 if tokens >= 0 else -tokens / self._rate
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds to wait before using it."""
+        return self._take(only_if_available=False)
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is available right now."""
+        return self._take(only_if_available=True) == 0.0
+
+    def close(self) -> None:
+        """Release this instance's reference to the shared state file."""
+        self._finalizer()
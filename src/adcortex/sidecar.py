@@ -0,0 +1,225 @@
+"""Local sidecar that shares one upstream connection pool between worker processes.
+
+The sidecar listens on a Unix domain socket and forwards ad requests to the
+ADCortex API. It owns the upstream connections, the rate limiter, the circuit
+breaker and a short-lived response cache, so every worker process on a host
+shares them instead of keeping its own.
+
+Each message on the socket is two length-prefixed frames: a JSON header frame
+and a raw body frame. Requests carry ``{"headers": {...}}`` and the request
+body; responses carry ``{"status": int, "headers": {...}}`` and the response
+body. Connections are persistent and handle requests one at a time.
+
+Run it with ``python -m adcortex.sidecar --socket /run/adcortex.sock``.
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from .core import AD_FETCH_URL, PreparedRequest
+from .state import CircuitBreaker, RateLimiter
+from .transports import (
+    DEFAULT_SOCKET_PATH,
+    AsyncHttpxTransport,
+    pack_frames,
+    read_frame,
+)
+
+logger = logging.getLogger(__name__)
+
+# Request headers forwarded upstream; everything else is owned by the sidecar
+_FORWARDED_HEADERS = ("content-type", "content-encoding", "x-api-key")
+
+
+class SidecarServer:
+    """Unix-socket server forwarding ad requests through shared upstream state."""
+
+    def __init__(
+        self,
+        socket_path: str = DEFAULT_SOCKET_PATH,
+        upstream_url: str = AD_FETCH_URL,
+        timeout: float = 10,
+        max_connections: int = 20,
+        rate_limit: Optional[float] = None,
+        rate_limit_burst: Optional[int] = None,
+        circuit_breaker_threshold: int = 5,
+        circuit_breaker_timeout: int = 120,
+        cache_ttl: float = 0,
+        max_cache_entries: int = 10000,
+        warmup_connections: int = 0,
+        keepalive: bool = False,
+    ):
+        """Configure the server; nothing is opened until :meth:`start`."""
+        self._socket_path = socket_path
+        self._upstream_url = upstream_url
+        self._timeout = timeout
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self._rate_limiter = RateLimiter(rate_limit, rate_limit_burst) if rate_limit else None
+        self._circuit_breaker = CircuitBreaker(
+            threshold=circuit_breaker_threshold,
+            timeout=circuit_breaker_timeout,
+        )
+        self._cache_ttl = cache_ttl
+        self._max_cache_entries = max_cache_entries
+        self._warmup_connections = warmup_connections
+        self._keepalive = keepalive
+        self._cache: Dict[str, Tuple[float, int, bytes]] = {}
+        self._transport: Optional[AsyncHttpxTransport] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        """Open the upstream pool and start listening on the socket."""
+        if os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+        self._transport = AsyncHttpxTransport(timeout=self._timeout, limits=self._limits)
+        if self._warmup_connections:
+            warmed = await self._transport.warmup(self._upstream_url, self._warmup_connections)
+            logger.info("Warmed %d upstream connections", warmed)
+        if self._keepalive:
+            self._transport.start_keepalive(self._upstream_url, connections=max(1, self._warmup_connections))
+        self._server = await asyncio.start_unix_server(self._handle_connection, path=self._socket_path)
+        logger.info("Sidecar listening on %s", self._socket_path)
+
+    async def serve_forever(self) -> None:
+        """Start the server and serve until cancelled."""
+        await self.start()
+        assert self._server is not None
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """Stop listening and close upstream connections."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._transport is not None:
+            await self._transport.aclose()
+            self._transport = None
+        if os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    header = json.loads(await read_frame(reader))
+                    body = await read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    return
+                status, response_body = await self._forward(header.get("headers", {}), body)
+                writer.write(pack_frames({"status": status, "headers": {"content-type": "application/json"}}, response_body))
+                await writer.drain()
+        except ConnectionError:
+            return
+        finally:
+            writer.close()
+
+    async def _forward(self, headers: Dict[str, str], body: bytes) -> Tuple[int, bytes]:
+        """Forward one request upstream, returning the status and response body."""
+        cache_key = self._cache_key(headers, body) if self._cache_ttl > 0 else None
+        if cache_key is not None:
+            cached = self._cache.get(cache_key)
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[1], cached[2]
+
+        if self._circuit_breaker.is_open():
+            return 503, b'{"error":"circuit breaker open"}'
+
+        if self._rate_limiter is not None:
+            delay = self._rate_limiter.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        if self._transport is None:
+            raise RuntimeError("Sidecar is not started")
+        forwarded = {k: v for k, v in headers.items() if k.lower() in _FORWARDED_HEADERS}
+        try:
+            response = await self._transport.send(PreparedRequest(self._upstream_url, forwarded, body))
+        except httpx.TimeoutException as e:
+            logger.error("Upstream request timed out: %s", e)
+            self._circuit_breaker.record_error()
+            return 504, b'{"error":"upstream timeout"}'
+        except httpx.RequestError as e:
+            logger.error("Upstream request failed: %s", e)
+            self._circuit_breaker.record_error()
+            return 502, b'{"error":"upstream unavailable"}'
+
+        if response.status_code >= 500:
+            self._circuit_breaker.record_error()
+        elif response.status_code == 200 and cache_key is not None:
+            self._store(cache_key, response.status_code, response.content)
+        return response.status_code, response.content
+
+    def _cache_key(self, headers: Dict[str, str], body: bytes) -> Optional[str]:
+        """Fingerprint a request by API key and payload, ignoring the request id."""
+        lowered = {k.lower(): v for k, v in headers.items()}
+        try:
+            if lowered.get("content-encoding") == "gzip":
+                body = gzip.decompress(body)
+            elif lowered.get("content-encoding"):
+                return None
+            payload = json.loads(body)
+        except (OSError, ValueError):
+            return None
+        payload.pop("RGUID", None)
+        digest = hashlib.sha256(lowered.get("x-api-key", "").encode("utf-8"))
+        digest.update(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _store(self, key: str, status: int, body: bytes) -> None:
+        now = time.monotonic()
+        if len(self._cache) >= self._max_cache_entries:
+            self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+            if len(self._cache) >= self._max_cache_entries:
+                self._cache.pop(next(iter(self._cache)))
+        self._cache[key] = (now + self._cache_ttl, status, body)
+
+
+def main() -> None:
+    """Run the sidecar from the command line."""
+    parser = argparse.ArgumentParser(description="ADCortex connection-sharing sidecar")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix socket path to listen on")
+    parser.add_argument("--upstream", default=AD_FETCH_URL, help="ADCortex ad match URL")
+    parser.add_argument("--timeout", type=float, default=10, help="Upstream request timeout in seconds")
+    parser.add_argument("--max-connections", type=int, default=20, help="Upstream connection pool size")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Upstream requests per second")
+    parser.add_argument("--rate-limit-burst", type=int, default=None, help="Rate limiter burst size")
+    parser.add_argument("--cache-ttl", type=float, default=0, help="Response cache TTL in seconds (0 disables)")
+    parser.add_argument("--warmup-connections", type=int, default=0, help="Upstream connections to open at startup")
+    parser.add_argument("--keepalive", action="store_true", help="Keep idle upstream connections from expiring")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    server = SidecarServer(
+        socket_path=args.socket,
+        upstream_url=args.upstream,
+        timeout=args.timeout,
+        max_connections=args.max_connections,
+        rate_limit=args.rate_limit,
+        rate_limit_burst=args.rate_limit_burst,
+        cache_ttl=args.cache_ttl,
+        warmup_connections=args.warmup_connections,
+        keepalive=args.keepalive,
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Versioned snapshots of per-session client state.
+
+Snapshots let a session move between workers or be hibernated to disk
+without losing its queued conversation, cached ad or breaker state. They are
+compact JSON documents encoded as UTF-8 bytes.
+"""
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from .types import Ad, QueuedMessage, SessionInfo
+
+SNAPSHOT_VERSION = 1
+
+
+class ClientSnapshot:
+    """Decoded client state, ready to be applied to a new client."""
+
+    __slots__ = ("session_info", "messages", "latest_ad", "circuit_breaker")
+
+    def __init__(
+        self,
+        session_info: SessionInfo,
+        messages: List[QueuedMessage],
+        latest_ad: Optional[Ad],
+        circuit_breaker: Optional[Dict[str, Any]],
+    ):
+        self.session_info = session_info
+        self.messages = messages
+        self.latest_ad = latest_ad
+        self.circuit_breaker = circuit_breaker
+
+
+def dump_state(
+    session_info: SessionInfo,
+    messages: Iterable[QueuedMessage],
+    latest_ad: Optional[Ad],
+    circuit_breaker: Optional[Dict[str, Any]],
+) -> bytes:
+    """Encode client state as a versioned snapshot."""
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "session_info": session_info.model_dump(mode="json"),
+        "messages": [[msg.role, msg.content] for msg in messages],
+        "latest_ad": latest_ad.model_dump() if latest_ad is not None else None,
+        "circuit_breaker": circuit_breaker,
+    }
+    return json.dumps(snapshot, separators=(",", ":")).encode("utf-8")
+
+
+def load_state(data: bytes) -> ClientSnapshot:
+    """Decode a snapshot produced by dump_state."""
+    snapshot = json.loads(data)
+    version = snapshot.get("version")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported client snapshot version: {version}")
+    latest_ad = snapshot.get("latest_ad")
+    return ClientSnapshot(
+        # Session info was validated before it was exported
+        session_info=SessionInfo.from_trusted(**snapshot["session_info"]),
+        messages=[QueuedMessage(role, content) for role, content in snapshot["messages"]],
+        latest_ad=Ad.model_validate(latest_ad) if latest_ad is not None else None,
+        circuit_breaker=snapshot.get("circuit_breaker"),
+    )
@@ -1,8 +1,14 @@
 """State management for ADCortex chat client."""
 from datetime import datetime, timezone, timedelta
 from enum import Enum, auto
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Dict, Optional, Union
 import logging
+import os
+import threading
+import time
+
+if TYPE_CHECKING:
+    from .shared_state import SharedCircuitBreaker, SharedRateLimiter
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +31,7 @@ class CircuitBreaker:
         self._reset_time: Optional[datetime] = None
         self._is_open = False
         self._disable_logging = disable_logging
+        self._lock = threading.Lock()
 
     def _log_error(self, message: str) -> None:
         """Log error message if logging is enabled."""
@@ -33,10 +40,13 @@ class CircuitBreaker:
 
     def record_error(self) -> None:
         """Record an error and update circuit breaker state."""
-        self._error_count += 1
-        if self._error_count >= self._threshold and not self._is_open:
-            self._is_open = True
-            self._reset_time = datetime.now(timezone.utc) + timedelta(seconds=self._timeout)
+        with self._lock:
+            self._error_count += 1
+            opened = self._error_count >= self._threshold and not self._is_open
+            if opened:
+                self._is_open = True
+                self._reset_time = datetime.now(timezone.utc) + timedelta(seconds=self._timeout)
+        if opened:
             self._log_error("Circuit breaker opened due to too many errors")
 
     def is_open(self) -> bool:
@@ -44,17 +54,113 @@ class CircuitBreaker:
         if not self._is_open:
             return False
 
-        now = datetime.now(timezone.utc)
-        if self._reset_time and now >= self._reset_time:
+        with self._lock:
+            now = datetime.now(timezone.utc)
+            if self._reset_time and now >= self._reset_time:
+                self._is_open = False
+                self._error_count = 0
+                self._reset_time = None
+                return False
+
+            return self._is_open
+
+    def reset(self) -> None:
+        """Reset the circuit breaker state."""
+        with self._lock:
             self._is_open = False
             self._error_count = 0
             self._reset_time = None
-            return False
 
-        return True
+    def export_state(self) -> Dict[str, Any]:
+        """Return the breaker state as a JSON-serializable dict."""
+        with self._lock:
+            return {
+                "error_count": self._error_count,
+                "reset_at": self._reset_time.timestamp() if self._reset_time else None,
+            }
 
-    def reset(self) -> None:
-        """Reset the circuit breaker state."""
-        self._is_open = False
-        self._error_count = 0
-        self._reset_time = None 
\ No newline at end of file
+    def restore_state(self, state: Dict[str, Any]) -> None:
+        """Restore breaker state produced by export_state."""
+        reset_at = state.get("reset_at")
+        with self._lock:
+            self._error_count = state.get("error_count", 0)
+            self._reset_time = datetime.fromtimestamp(reset_at, timezone.utc) if reset_at else None
+            self._is_open = self._reset_time is not None
+
+    def close(self) -> None:
+        """In-process state holds no resources; present for interface parity."""
+
+
+class RateLimiter:
+    """Token bucket rate limiter for outgoing ad requests."""
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[int] = None
+    ):
+        self._rate = rate
+        self._capacity = float(burst if burst is not None else max(1, int(rate)))
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds to wait before using it."""
+        with self._lock:
+            return self._reserve()
+
+    def _reserve(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self._rate
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is available right now."""
+        with self._lock:
+            if self._reserve() > 0:
+                self._tokens += 1
+                return False
+            return True
+
+    def close(self) -> None:
+        """In-process state holds no resources; present for interface parity."""
+
+
+def create_circuit_breaker(
+    threshold: int = 5,
+    timeout: int = 120,
+    disable_logging: bool = False,
+    shared_state_dir: Optional[str] = None
+) -> Union[CircuitBreaker, "SharedCircuitBreaker"]:
+    """Create a circuit breaker, shared across processes if a state directory is given."""
+    if not shared_state_dir:
+        return CircuitBreaker(threshold=threshold, timeout=timeout, disable_logging=disable_logging)
+
+    from .shared_state import BREAKER_FILE_NAME, SharedCircuitBreaker
+
+    return SharedCircuitBreaker(
+        os.path.join(shared_state_dir, BREAKER_FILE_NAME),
+        threshold=threshold,
+        timeout=timeout,
+        disable_logging=disable_logging
+    )
+
+
+def create_rate_limiter(
+    rate: Optional[float],
+    burst: Optional[int] = None,
+    shared_state_dir: Optional[str] = None
+) -> Union[RateLimiter, "SharedRateLimiter", None]:
+    """Create a rate limiter, shared across processes if a state directory is given."""
+    if not rate:
+        return None
+    if not shared_state_dir:
+        return RateLimiter(rate, burst)
+
+    from .shared_state import RATE_LIMITER_FILE_NAME, SharedRateLimiter
+
+    return SharedRateLimiter(os.path.join(shared_state_dir, RATE_LIMITER_FILE_NAME), rate, burst)
@@ -0,0 +1,147 @@
+"""Thread-safe synchronous chat client for multi-threaded servers.
+
+:class:`ThreadSafeAdcortexChatClient` can be called from many threads at once.
+Queue, state and latest-ad updates happen under a per-client lock, and each
+session has at most one fetch in flight. Fetches run on a bounded thread pool
+shared by every client in the process instead of on the calling thread.
+"""
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, List, Optional
+
+from .chat_client import AdcortexChatClient
+from .state import ClientState
+from .types import Ad, QueuedMessage, Role
+
+DEFAULT_MAX_WORKERS = 16
+
+_shared_executor: Optional[ThreadPoolExecutor] = None
+_shared_executor_lock = threading.Lock()
+
+
+def get_shared_executor(max_workers: int = DEFAULT_MAX_WORKERS) -> ThreadPoolExecutor:
+    """Return the process-wide fetch executor, creating it on first use.
+
+    ``max_workers`` only applies when the executor is created.
+    """
+    global _shared_executor
+    if _shared_executor is None:
+        with _shared_executor_lock:
+            if _shared_executor is None:
+                _shared_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="adcortex-fetch")
+    return _shared_executor
+
+
+class ThreadSafeAdcortexChatClient(AdcortexChatClient):
+    """AdcortexChatClient that may be shared between threads.
+
+    Takes the same arguments as :class:`AdcortexChatClient`, plus ``executor``,
+    which defaults to the shared pool from :func:`get_shared_executor`.
+    Calling the client queues the message and returns at once; use
+    :meth:`submit` instead to get a Future for the fetch. User turns queued
+    while a fetch is in flight are fetched for as soon as it finishes.
+    """
+
+    def __init__(self, *args: Any, executor: Optional[Executor] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._executor = executor
+        # Completes when the follow-up fetch for turns queued mid-fetch is done
+        self._follow_up: Optional["Future[None]"] = None
+
+    def __call__(self, role: Role, content: str) -> None:
+        """Add a message to the queue and schedule a fetch if none is in flight."""
+        self.submit(role, content)
+
+    def submit(self, role: Role, content: str) -> "Future[None]":
+        """Queue a message and return a Future that completes once its fetch, if any, is done."""
+        with self._lock:
+            self._queue_message(role, content)
+
+            if role == Role.user and self._state == ClientState.PROCESSING:
+                # Picked up by the follow-up fetch once the current one finishes
+                if self._follow_up is None:
+                    self._follow_up = Future()
+                return self._follow_up
+
+            # Check-and-set under the lock so one session never runs two fetches
+            start = self._should_start(role)
+            if start:
+                self._state = ClientState.PROCESSING
+                messages = list(self._message_queue)
+
+        if not start:
+            done: "Future[None]" = Future()
+            done.set_result(None)
+            return done
+        return self._schedule(messages)
+
+    def _schedule(self, messages: List[QueuedMessage]) -> "Future[None]":
+        """Run a fetch on the executor; the caller has already set PROCESSING."""
+        executor = self._executor or get_shared_executor()
+        try:
+            return executor.submit(self._run_batch, messages)
+        except RuntimeError:
+            # Executor shut down: leave the messages queued for a later turn
+            with self._lock:
+                self._state = ClientState.IDLE
+                follow_up, self._follow_up = self._follow_up, None
+            if follow_up is not None:
+                follow_up.set_result(None)
+            raise
+
+    def _run_batch(self, messages: List[QueuedMessage]) -> None:
+        """Fetch for a queue snapshot on an executor thread."""
+        try:
+            self._process_batch(messages)
+        except Exception as e:
+            self._record_fetch_failure(e)
+        finally:
+            self._finish_batch(messages)
+
+    def _finish_batch(self, messages: List[QueuedMessage]) -> None:
+        """Go idle, or start a follow-up fetch for user turns queued during this one."""
+        processed = {id(message) for message in messages}
+        with self._lock:
+            follow_up, self._follow_up = self._follow_up, None
+            arrived = any(
+                message.role == Role.user.value and id(message) not in processed
+                for message in self._message_queue
+            )
+            if arrived and self._ready_to_fetch():
+                next_messages = list(self._message_queue)
+            else:
+                next_messages = None
+                self._state = ClientState.IDLE
+
+        if next_messages is None:
+            if follow_up is not None:
+                follow_up.set_result(None)
+            return
+        try:
+            future = self._schedule(next_messages)
+        except RuntimeError:
+            self._log_error("Follow-up fetch not scheduled: executor is shut down")
+            if follow_up is not None:
+                follow_up.set_result(None)
+            return
+        if follow_up is not None:
+            future.add_done_callback(lambda _: follow_up.set_result(None))
+
+    def _consume_processed(self, count: int) -> None:
+        with self._lock:
+            super()._consume_processed(count)
+
+    def _set_latest_ad(self, ad: Ad) -> None:
+        with self._lock:
+            self.latest_ad = ad
+
+    def get_latest_ad(self) -> Optional[Ad]:
+        """Get the latest ad and clear it from memory."""
+        with self._lock:
+            return super().get_latest_ad()
+
+    def export_state(self) -> bytes:
+        """Export the session's queue, latest ad and breaker state as a versioned snapshot."""
+        with self._lock:
+            return super().export_state()
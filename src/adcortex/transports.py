@@ -0,0 +1,396 @@
+"""Pluggable sync and async transports for ADCortex clients.
+
+A transport sends a :class:`adcortex.core.PreparedRequest` and returns a
+:class:`adcortex.core.RawResponse`. Network failures are raised as
+``httpx.TimeoutException`` or ``httpx.RequestError`` so the clients' retry
+and circuit breaker handling works the same for every transport.
+"""
+import asyncio
+import inspect
+import json
+import socket
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+import httpx
+
+from .core import PreparedRequest, RawResponse
+
+DEFAULT_SOCKET_PATH = "/tmp/adcortex-sidecar.sock"
+
+# Unix socket messages are a JSON header frame followed by a raw body frame,
+# each prefixed with its length as a 4-byte big-endian integer.
+_FRAME_HEADER = struct.Struct(">I")
+
+
+def pack_frames(header: Dict[str, Any], body: bytes) -> bytes:
+    """Encode a header dict and body as two length-prefixed frames."""
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return b"".join((
+        _FRAME_HEADER.pack(len(header_bytes)),
+        header_bytes,
+        _FRAME_HEADER.pack(len(body)),
+        body,
+    ))
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    """Read exactly ``size`` bytes from a blocking socket."""
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("Sidecar closed the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_frame(sock: socket.socket) -> bytes:
+    """Read one length-prefixed frame from a blocking socket."""
+    (size,) = _FRAME_HEADER.unpack(_recv_exact(sock, _FRAME_HEADER.size))
+    return _recv_exact(sock, size)
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    """Read one length-prefixed frame from an asyncio stream."""
+    (size,) = _FRAME_HEADER.unpack(await reader.readexactly(_FRAME_HEADER.size))
+    return await reader.readexactly(size)
+
+
+class Transport:
+    """Base class for synchronous transports."""
+
+    def send(self, request: PreparedRequest) -> RawResponse:
+        """Send a request and return its response."""
+        raise NotImplementedError
+
+    def warmup(self, url: str, connections: int = 4) -> int:
+        """Open pooled connections to ``url`` ahead of time; returns how many succeeded."""
+        return 0
+
+    def start_keepalive(self, url: str, interval: Optional[float] = None, connections: int = 1) -> None:
+        """Periodically touch ``url`` so idle pooled connections are not reaped."""
+
+    def stop_keepalive(self) -> None:
+        """Stop the background keep-alive, if running."""
+
+    def close(self) -> None:
+        """Release any resources held by the transport."""
+
+
+class AsyncTransport:
+    """Base class for asynchronous transports."""
+
+    async def send(self, request: PreparedRequest) -> RawResponse:
+        """Send a request and return its response."""
+        raise NotImplementedError
+
+    async def warmup(self, url: str, connections: int = 4) -> int:
+        """Open pooled connections to ``url`` ahead of time; returns how many succeeded."""
+        return 0
+
+    def start_keepalive(self, url: str, interval: Optional[float] = None, connections: int = 1) -> None:
+        """Periodically touch ``url`` so idle pooled connections are not reaped."""
+
+    async def stop_keepalive(self) -> None:
+        """Stop the background keep-alive, if running."""
+
+    async def aclose(self) -> None:
+        """Release any resources held by the transport."""
+
+
+def _request_timeout(request: PreparedRequest) -> Any:
+    return httpx.USE_CLIENT_DEFAULT if request.timeout is None else request.timeout
+
+
+def _keepalive_interval(limits: httpx.Limits, interval: Optional[float]) -> Optional[float]:
+    """Default to pinging a little before the pool would expire idle connections."""
+    if interval is not None:
+        return interval
+    if limits.keepalive_expiry is None:
+        return None
+    return limits.keepalive_expiry * 0.8
+
+
+def _timeout_seconds(request: PreparedRequest) -> Optional[float]:
+    """Return a request timeout in seconds for transports that take a single value."""
+    if isinstance(request.timeout, httpx.Timeout):
+        return request.timeout.read
+    return request.timeout
+
+
+class HttpxTransport(Transport):
+    """Sends requests over a pooled, long-lived ``httpx.Client``."""
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        limits: Optional[httpx.Limits] = None,
+        client: Optional[httpx.Client] = None,
+    ):
+        """Use ``client`` if given, otherwise create one with ``timeout`` and ``limits`` on first use."""
+        self._timeout = timeout
+        self._limits = limits or httpx.Limits()
+        self._client = client
+        self._keepalive_thread: Optional[threading.Thread] = None
+        self._keepalive_stop = threading.Event()
+
+    @property
+    def client(self) -> httpx.Client:
+        """The underlying client, created on first use."""
+        if self._client is None:
+            self._client = httpx.Client(timeout=self._timeout, limits=self._limits)
+        return self._client
+
+    def send(self, request: PreparedRequest) -> RawResponse:
+        """Send a request over the pooled client."""
+        response = self.client.request(
+            request.method,
+            request.url,
+            headers=request.headers,
+            content=request.body,
+            timeout=_request_timeout(request),
+        )
+        return RawResponse(response.status_code, response.content, response.headers)
+
+    def _touch(self, url: str) -> bool:
+        try:
+            self.client.head(url)
+            return True
+        except httpx.HTTPError:
+            return False
+
+    def warmup(self, url: str, connections: int = 4) -> int:
+        """Send concurrent HEAD requests so each one opens its own pooled connection.
+
+        Any response counts as a warm connection; DNS, TCP and TLS setup is
+        what is being paid up front.
+        """
+        if self._limits.max_connections is not None:
+            connections = min(connections, self._limits.max_connections)
+        self.client  # create the pool before the threads race to do so
+        if connections <= 1:
+            return int(self._touch(url))
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            return sum(executor.map(self._touch, [url] * connections))
+
+    def start_keepalive(self, url: str, interval: Optional[float] = None, connections: int = 1) -> None:
+        """Re-warm ``connections`` connections every ``interval`` seconds from a daemon thread.
+
+        ``interval`` defaults to 80% of the pool's keep-alive expiry.
+        """
+        interval = _keepalive_interval(self._limits, interval)
+        if interval is None or self._keepalive_thread is not None:
+            return
+        self._keepalive_stop.clear()
+
+        def run() -> None:
+            while not self._keepalive_stop.wait(interval):
+                self.warmup(url, connections)
+
+        self._keepalive_thread = threading.Thread(target=run, name="adcortex-keepalive", daemon=True)
+        self._keepalive_thread.start()
+
+    def stop_keepalive(self) -> None:
+        """Stop the keep-alive thread and wait for it to exit."""
+        if self._keepalive_thread is not None:
+            self._keepalive_stop.set()
+            self._keepalive_thread.join()
+            self._keepalive_thread = None
+
+    def close(self) -> None:
+        """Stop the keep-alive and close the pooled client."""
+        self.stop_keepalive()
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+
+class AsyncHttpxTransport(AsyncTransport):
+    """Sends requests over a pooled, long-lived ``httpx.AsyncClient``."""
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        limits: Optional[httpx.Limits] = None,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        """Use ``client`` if given, otherwise create one with ``timeout`` and ``limits`` on first use."""
+        self._timeout = timeout
+        self._limits = limits or httpx.Limits()
+        self._client = client
+        self._keepalive_task: Optional[asyncio.Task] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The underlying client, created on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self._timeout, limits=self._limits)
+        return self._client
+
+    async def send(self, request: PreparedRequest) -> RawResponse:
+        """Send a request over the pooled client."""
+        response = await self.client.request(
+            request.method,
+            request.url,
+            headers=request.headers,
+            content=request.body,
+            timeout=_request_timeout(request),
+        )
+        return RawResponse(response.status_code, response.content, response.headers)
+
+    async def _touch(self, url: str) -> bool:
+        try:
+            await self.client.head(url)
+            return True
+        except httpx.HTTPError:
+            return False
+
+    async def warmup(self, url: str, connections: int = 4) -> int:
+        """Send concurrent HEAD requests so each one opens its own pooled connection."""
+        if self._limits.max_connections is not None:
+            connections = min(connections, self._limits.max_connections)
+        results = await asyncio.gather(*(self._touch(url) for _ in range(max(1, connections))))
+        return sum(results)
+
+    def start_keepalive(self, url: str, interval: Optional[float] = None, connections: int = 1) -> None:
+        """Re-warm ``connections`` connections every ``interval`` seconds from a task on the running loop.
+
+        ``interval`` defaults to 80% of the pool's keep-alive expiry.
+        """
+        interval = _keepalive_interval(self._limits, interval)
+        if interval is None or self._keepalive_task is not None:
+            return
+
+        async def run() -> None:
+            while True:
+                await asyncio.sleep(interval)
+                await self.warmup(url, connections)
+
+        self._keepalive_task = asyncio.get_running_loop().create_task(run())
+
+    async def stop_keepalive(self) -> None:
+        """Cancel the keep-alive task and wait for it to finish."""
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            try:
+                await self._keepalive_task
+            except asyncio.CancelledError:
+                pass
+            self._keepalive_task = None
+
+    async def aclose(self) -> None:
+        """Stop the keep-alive and close the pooled client."""
+        await self.stop_keepalive()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class InMemoryTransport(Transport):
+    """Answers requests with a local handler function, without any network I/O."""
+
+    def __init__(self, handler: Callable[[PreparedRequest], RawResponse]):
+        """Answer every request with ``handler(request)``."""
+        self._handler = handler
+
+    def send(self, request: PreparedRequest) -> RawResponse:
+        """Return the handler's response to the request."""
+        return self._handler(request)
+
+
+class AsyncInMemoryTransport(AsyncTransport):
+    """Async counterpart of :class:`InMemoryTransport`; the handler may be sync or async."""
+
+    def __init__(self, handler: Callable[[PreparedRequest], Union[RawResponse, Awaitable[RawResponse]]]):
+        """Answer every request with ``handler(request)``, awaiting it if needed."""
+        self._handler = handler
+
+    async def send(self, request: PreparedRequest) -> RawResponse:
+        """Return the handler's response to the request."""
+        response = self._handler(request)
+        if inspect.isawaitable(response):
+            response = await response
+        return response
+
+
+def _to_raw_response(header_frame: bytes, body: bytes) -> RawResponse:
+    header = json.loads(header_frame)
+    return RawResponse(header["status"], body, header.get("headers"))
+
+
+class UnixSocketTransport(Transport):
+    """Sends requests to a local :mod:`adcortex.sidecar` over a persistent Unix socket."""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH):
+        """Connect lazily to the sidecar listening on ``socket_path``."""
+        self._socket_path = socket_path
+        self._sock: Optional[socket.socket] = None
+
+    def send(self, request: PreparedRequest) -> RawResponse:
+        """Send a request to the sidecar, reconnecting after a failed exchange."""
+        timeout = _timeout_seconds(request)
+        try:
+            if self._sock is None:
+                self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self._sock.settimeout(timeout)
+                self._sock.connect(self._socket_path)
+            self._sock.settimeout(timeout)
+            self._sock.sendall(pack_frames({"headers": request.headers}, request.body))
+            header_frame = recv_frame(self._sock)
+            return _to_raw_response(header_frame, recv_frame(self._sock))
+        except socket.timeout as e:
+            self.close()
+            raise httpx.ReadTimeout(f"Sidecar request timed out: {e}") from e
+        except OSError as e:
+            self.close()
+            raise httpx.ConnectError(f"Sidecar unavailable: {e}") from e
+
+    def close(self) -> None:
+        """Close the socket to the sidecar."""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+class AsyncUnixSocketTransport(AsyncTransport):
+    """Async counterpart of :class:`UnixSocketTransport`."""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH):
+        """Connect lazily to the sidecar listening on ``socket_path``."""
+        self._socket_path = socket_path
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def send(self, request: PreparedRequest) -> RawResponse:
+        """Send a request to the sidecar, reconnecting after a failed exchange."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                return await asyncio.wait_for(self._exchange(request), _timeout_seconds(request))
+            except asyncio.TimeoutError as e:
+                await self.aclose()
+                raise httpx.ReadTimeout("Sidecar request timed out") from e
+            except (OSError, asyncio.IncompleteReadError) as e:
+                await self.aclose()
+                raise httpx.ConnectError(f"Sidecar unavailable: {e}") from e
+
+    async def _exchange(self, request: PreparedRequest) -> RawResponse:
+        if self._reader is None or self._writer is None:
+            self._reader, self._writer = await asyncio.open_unix_connection(self._socket_path)
+        reader, writer = self._reader, self._writer
+        writer.write(pack_frames({"headers": request.headers}, request.body))
+        await writer.drain()
+        header_frame = await read_frame(reader)
+        return _to_raw_response(header_frame, await read_frame(reader))
+
+    async def aclose(self) -> None:
+        """Close the connection to the sidecar."""
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
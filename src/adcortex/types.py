@@ -4,9 +4,9 @@ This module defines data classes and enumerations used by the ADCortex API clien
 """
 
 from enum import Enum
-from typing import Any, Dict, List
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List
 
-import pycountry
 from pydantic import BaseModel, field_validator, Field
 
 
@@ -49,6 +49,19 @@ class Role(str, Enum):
     ai = "ai"
 
 
+class AdEventType(str, Enum):
+    """
+    Ad event enumeration.
+
+    Attributes:
+        impression: The ad was shown to the user.
+        click: The user followed the ad link.
+    """
+
+    impression = "impression"
+    click = "click"
+
+
 class Interest(str, Enum):
     """
     Interest enumeration.
@@ -128,6 +141,22 @@ class Language(Enum):
     vi = "vi"  # Vietnamese
 
 
+# Validation lookup tables, built once instead of on every UserInfo construction.
+_GENDER_VALUES: FrozenSet[str] = frozenset(Gender.__members__)
+_GENDER_ERROR = f"Gender must be one of: {', '.join(Gender.__members__.keys())}."
+_LANGUAGE_VALUES: FrozenSet[str] = frozenset(Language.__members__)
+_LANGUAGE_ERROR = f"Language must be one of: {', '.join(Language.__members__.keys())}."
+_INTEREST_NAMES = ", ".join(Interest.__members__.keys())
+
+
+@lru_cache(maxsize=None)
+def _country_codes() -> FrozenSet[str]:
+    """Return the set of ISO 3166-1 alpha-2 codes, loading pycountry on first use."""
+    import pycountry  # imported lazily, the country database is slow to load
+
+    return frozenset(country.alpha_2 for country in pycountry.countries)
+
+
 class UserInfo(BaseModel):
     """
     Stores user information for ADCortex API.
@@ -162,21 +191,17 @@ class UserInfo(BaseModel):
         """
         Validate that the provided gender is one of the defined Gender enum values.
         """
-        if value not in Gender.__members__:
-            raise ValueError(
-                f"Gender must be one of: {', '.join(Gender.__members__.keys())}."
-            )
+        if value not in _GENDER_VALUES:
+            raise ValueError(_GENDER_ERROR)
         return value
 
     @field_validator("language")
     def validate_language(cls, value):
         """
-        Validate that the provided gender is one of the defined Gender enum values.
+        Validate that the provided language is one of the defined Language enum values.
         """
-        if value not in Language.__members__:
-            raise ValueError(
-                f"Language must be one of: {', '.join(Language.__members__.keys())}."
-            )
+        if value not in _LANGUAGE_VALUES:
+            raise ValueError(_LANGUAGE_ERROR)
         return value
 
     @field_validator("interests")
@@ -187,7 +212,7 @@ class UserInfo(BaseModel):
         for interest in value:
             if not isinstance(interest, Interest):
                 raise ValueError(
-                    f"Interest '{interest}' must be an Interest enum value. Valid values are: {', '.join(Interest.__members__.keys())}."
+                    f"Interest '{interest}' must be an Interest enum value. Valid values are: {_INTEREST_NAMES}."
                 )
         return value
 
@@ -196,8 +221,17 @@ class UserInfo(BaseModel):
         """
         Validate that the provided country code is a valid ISO 3166-1 alpha-2 code.
         """
-        country = pycountry.countries.get(alpha_2=value.upper())
-        return value if country else None
+        return value if value.upper() in _country_codes() else None
+
+    @classmethod
+    def from_trusted(cls, **data: Any) -> "UserInfo":
+        """
+        Build a UserInfo from data that has already been validated, skipping validators.
+
+        Interests are still coerced to Interest members so payloads serialize correctly.
+        """
+        data["interests"] = [Interest(interest) for interest in data.get("interests", [])]
+        return cls.model_construct(**data)
 
 
 class SessionInfo(BaseModel):
@@ -218,6 +252,19 @@ class SessionInfo(BaseModel):
     user_info: UserInfo
     platform: Platform
 
+    @classmethod
+    def from_trusted(cls, **data: Any) -> "SessionInfo":
+        """
+        Build a SessionInfo from data that has already been validated, skipping validators.
+
+        Nested ``user_info`` and ``platform`` may be given as models or plain dicts.
+        """
+        if isinstance(data.get("user_info"), dict):
+            data["user_info"] = UserInfo.from_trusted(**data["user_info"])
+        if isinstance(data.get("platform"), dict):
+            data["platform"] = Platform.model_construct(**data["platform"])
+        return cls.model_construct(**data)
+
 
 class Message(BaseModel):
     """
@@ -234,6 +281,49 @@ class Message(BaseModel):
     # timestamp: float  # Add timestamp field
 
 
+_ROLE_VALUES: Dict[str, str] = {role.value: role.value for role in Role}
+
+
+class QueuedMessage:
+    """
+    Lightweight message record held in the client queues.
+
+    Messages are validated once when they are queued and kept with the role
+    already encoded, so payloads can be serialized without a model dump.
+
+    Attributes:
+        role (str): Encoded role of the message sender ("user" or "ai").
+        content (str): The content of the message.
+    """
+
+    __slots__ = ("role", "content")
+
+    def __init__(self, role: str, content: str):
+        self.role = role
+        self.content = content
+
+    @classmethod
+    def create(cls, role: Any, content: Any) -> "QueuedMessage":
+        """
+        Validate a role and content pair and build a queued message from it.
+        """
+        role_value = _ROLE_VALUES.get(role)
+        if role_value is None:
+            raise ValueError(f"Role must be one of: {', '.join(_ROLE_VALUES)}.")
+        if not isinstance(content, str):
+            raise ValueError("Message content must be a string.")
+        return cls(role_value, content)
+
+    def to_dict(self) -> Dict[str, str]:
+        """
+        Return the message in its API payload form.
+        """
+        return {"role": self.role, "content": self.content}
+
+    def __repr__(self) -> str:
+        return f"QueuedMessage(role={self.role!r}, content={self.content!r})"
+
+
 class Ad(BaseModel):
     """
     Represents an advertisement fetched via the ADCortex API.
@@ -0,0 +1,119 @@
+"""Keys, reloads and compaction of the persistent ad cache."""
+import asyncio
+import json
+import os
+import time
+from typing import List
+
+from adcortex.ad_cache import PersistentAdCache, context_fingerprint
+from adcortex.async_chat_client import AsyncAdcortexChatClient
+from adcortex.core import PreparedRequest, RawResponse
+from adcortex.transports import AsyncInMemoryTransport
+from adcortex.types import Ad, QueuedMessage, Role, SessionInfo, UserInfo
+
+SESSION = SessionInfo(
+    session_id="s",
+    character_name="c",
+    character_metadata="m",
+    user_info=UserInfo(user_id="u", age=30, gender="male", location="US", language="en", interests=["technology"]),
+    platform={"name": "p"},
+)
+
+
+def _ad(idx: int) -> Ad:
+    return Ad.model_construct(ad_title=f"Ad {idx}", ad_description="d", placement_template="p", link="https://x")
+
+
+def _turns(*pairs: str) -> List[QueuedMessage]:
+    roles = [Role.ai, Role.user]
+    return [QueuedMessage.create(roles[i % 2], content) for i, content in enumerate(pairs)]
+
+
+def test_fingerprint_includes_the_preceding_ai_turn() -> None:
+    laptop = _turns("Want to see some laptops?", "yes")
+    shoes = _turns("Should I suggest running shoes?", "yes")
+    assert context_fingerprint(laptop) != context_fingerprint(shoes)
+
+    # Earlier queued messages and formatting do not change the key
+    longer = [QueuedMessage.create(Role.user, "hi")] + _turns("want to see some  LAPTOPS?", "Yes")
+    assert context_fingerprint(longer) == context_fingerprint(laptop)
+
+
+def test_entries_survive_a_restart(tmp_path) -> None:
+    path = str(tmp_path / "ads.jsonl")
+    cache = PersistentAdCache(path)
+    cache.put("s", "live", _ad(1))
+    cache.put("s", "replaced", _ad(2))
+    cache.put("s", "replaced", _ad(3))
+    cache.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"k": "s:torn", "t"')
+
+    restarted = PersistentAdCache(path)
+    assert restarted.get("s", "live").ad_title == "Ad 1"
+    assert restarted.get("s", "replaced").ad_title == "Ad 3"
+    assert restarted.get("s", "torn") is None
+    restarted.close()
+
+
+def test_expired_entries_are_not_reloaded(tmp_path) -> None:
+    path = str(tmp_path / "ads.jsonl")
+    cache = PersistentAdCache(path, ttl=0.01)
+    cache.put("s", "old", _ad(1))
+    cache.close()
+    time.sleep(0.02)
+
+    restarted = PersistentAdCache(path)
+    assert restarted.get("s", "old") is None
+    assert restarted.get_stats()["entries"] == 0
+    restarted.close()
+
+
+def test_compaction_keeps_only_live_entries(tmp_path) -> None:
+    path = str(tmp_path / "ads.jsonl")
+    cache = PersistentAdCache(path, min_compact_lines=10)
+    for i in range(10):
+        cache.put("s", "same", _ad(i))
+
+    # The tenth append starts a background compaction
+    deadline = time.monotonic() + 5
+    while cache.get_stats()["file_lines"] != 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.get_stats()["file_lines"] == 1
+    assert not os.path.exists(f"{path}.compact")
+
+    cache.put("s", "other", _ad(20))
+    cache.close()
+    with open(path, encoding="utf-8") as f:
+        keys = [json.loads(line)["k"] for line in f]
+    assert keys == ["s:same", "s:other"]
+
+    restarted = PersistentAdCache(path)
+    assert restarted.get("s", "same").ad_title == "Ad 9"
+    assert restarted.get("s", "other").ad_title == "Ad 20"
+    restarted.close()
+
+
+def test_async_client_serves_a_repeated_exchange_from_the_cache(tmp_path) -> None:
+    requests: List[PreparedRequest] = []
+
+    async def api(request: PreparedRequest) -> RawResponse:
+        requests.append(request)
+        ad = _ad(len(requests)).__dict__
+        return RawResponse(200, json.dumps({"ads": [ad]}).encode())
+
+    cache = PersistentAdCache(str(tmp_path / "ads.jsonl"))
+
+    async def scenario() -> List[str]:
+        client = AsyncAdcortexChatClient(SESSION, api_key="k", ad_cache=cache)
+        client._transport = AsyncInMemoryTransport(api)
+        served = []
+        for question in ["Want to see some laptops?", "Should I suggest running shoes?", "Want to see some laptops?"]:
+            await client(Role.ai, question)
+            await client(Role.user, "yes")
+            served.append(client.get_latest_ad().ad_title)
+        return served
+
+    assert asyncio.run(scenario()) == ["Ad 1", "Ad 2", "Ad 1"]
+    assert len(requests) == 2
+    cache.close()
@@ -0,0 +1,104 @@
+"""Batching, retry and drop accounting of the ad event reporters."""
+import asyncio
+import json
+from typing import List
+
+from adcortex.core import PreparedRequest, RawResponse
+from adcortex.events import AsyncEventReporter, EventReporter
+from adcortex.transports import AsyncInMemoryTransport, InMemoryTransport
+from adcortex.types import Ad
+
+AD = Ad.model_construct(idx=1, ad_title="Laptop", ad_description="d", placement_template="p", link="https://x")
+
+
+class _Api:
+    """Events endpoint that rejects batches containing a given session."""
+
+    def __init__(self, reject_session: str = "", status: int = 400):
+        self.reject_session = reject_session
+        self.status = status
+        self.received: List[str] = []
+
+    def __call__(self, request: PreparedRequest) -> RawResponse:
+        sessions = [event["session_id"] for event in json.loads(request.body)["events"]]
+        if self.reject_session in sessions:
+            return RawResponse(self.status)
+        self.received.extend(sessions)
+        return RawResponse(200)
+
+
+def _reporter(api: _Api, **kwargs) -> EventReporter:
+    return EventReporter(api_key="k", transport=InMemoryTransport(api), flush_interval=60, **kwargs)
+
+
+def test_rejected_batch_is_dropped_without_blocking_later_events() -> None:
+    api = _Api(reject_session="bad")
+    reporter = _reporter(api, max_batch_size=1)
+    reporter.report_impression("bad", AD)
+    for i in range(10):
+        reporter.report_impression(f"s{i}", AD)
+    reporter.flush()
+    reporter.close()
+
+    assert sorted(api.received) == sorted(f"s{i}" for i in range(10))
+    stats = reporter.get_stats()
+    assert stats["sent"] == 10
+    assert stats["dropped"] == 1
+    assert stats["buffered"] == 0
+
+
+def test_server_errors_are_retried() -> None:
+    api = _Api(reject_session="s0", status=503)
+    reporter = _reporter(api)
+    reporter.report_impression("s0", AD)
+    reporter.flush()
+    assert reporter.get_stats()["buffered"] == 1
+
+    api.reject_session = ""
+    reporter.flush()
+    assert api.received == ["s0"]
+    reporter.close()
+
+
+def test_unsent_and_late_events_count_as_dropped() -> None:
+    api = _Api(reject_session="s0", status=503)
+    reporter = _reporter(api, shutdown_attempts=2)
+    reporter.report_impression("s0", AD)
+    reporter.close()
+    reporter.report_click("s1", AD)
+
+    stats = reporter.get_stats()
+    assert stats["recorded"] == 2
+    assert stats["dropped"] == 2
+    assert stats["recorded"] == stats["sent"] + stats["dropped"] + stats["buffered"]
+
+
+def test_async_reporter_starts_its_task_once_a_loop_is_running() -> None:
+    api = _Api()
+    reporter = AsyncEventReporter(api_key="k", transport=AsyncInMemoryTransport(api), flush_interval=0.01)
+    # Outside a loop the event is only buffered
+    reporter.report_impression("s0", AD)
+
+    async def run() -> None:
+        reporter.report_click("s1", AD)
+        await asyncio.sleep(0.1)
+        assert api.received == ["s0", "s1"]
+        await reporter.aclose()
+
+    asyncio.run(run())
+    assert reporter.get_stats()["sent"] == 2
+
+
+def test_async_reporter_drops_rejected_batches() -> None:
+    api = _Api(reject_session="bad")
+    reporter = AsyncEventReporter(api_key="k", transport=AsyncInMemoryTransport(api), max_batch_size=1)
+
+    async def run() -> None:
+        reporter.report_impression("bad", AD)
+        reporter.report_impression("ok", AD)
+        await reporter.flush()
+        await reporter.aclose()
+
+    asyncio.run(run())
+    assert api.received == ["ok"]
+    assert reporter.get_stats()["dropped"] == 1
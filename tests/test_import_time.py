@@ -0,0 +1,50 @@
+"""Import-time budget for the adcortex package."""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Generous enough for slow CI machines; a regression to eager imports of
+# httpx and pydantic costs well over this.
+IMPORT_BUDGET_SECONDS = 0.05
+
+HEAVY_MODULES = ("httpx", "pydantic", "tenacity", "pycountry", "dotenv")
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import adcortex
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def _import_adcortex() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SRC_DIR), env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE], capture_output=True, text=True, check=True, env=env
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_does_not_load_heavy_dependencies() -> None:
+    modules = set(_import_adcortex()["modules"])
+    loaded = [name for name in HEAVY_MODULES if name in modules]
+    assert not loaded, f"importing adcortex loaded {loaded}"
+
+
+def test_import_time_within_budget() -> None:
+    # Best of a few runs to smooth out process startup noise
+    elapsed = min(_import_adcortex()["elapsed"] for _ in range(3))
+    assert elapsed < IMPORT_BUDGET_SECONDS, f"import adcortex took {elapsed:.4f}s"
+
+
+def test_lazy_attributes_resolve() -> None:
+    import adcortex
+
+    assert adcortex.AdcortexChatClient.__name__ == "AdcortexChatClient"
+    assert "AsyncAdcortexChatClient" in dir(adcortex)
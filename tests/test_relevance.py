@@ -0,0 +1,63 @@
+"""Turn accounting of the relevance gate."""
+import json
+import threading
+from typing import List
+
+from adcortex.chat_client import AdcortexChatClient
+from adcortex.core import PreparedRequest, RawResponse
+from adcortex.relevance import HeuristicRelevanceGate, RelevanceGate
+from adcortex.transports import InMemoryTransport
+from adcortex.types import QueuedMessage, Role, SessionInfo, UserInfo
+
+SESSION = SessionInfo(
+    session_id="s",
+    character_name="c",
+    character_metadata="m",
+    user_info=UserInfo(user_id="u", age=30, gender="male", location="US", language="en", interests=["technology"]),
+    platform={"name": "p"},
+)
+
+
+def test_only_sent_requests_count_as_fetched() -> None:
+    requests: List[PreparedRequest] = []
+
+    def api(request: PreparedRequest) -> RawResponse:
+        requests.append(request)
+        return RawResponse(200, json.dumps({"ads": []}).encode())
+
+    gate = RelevanceGate()
+    client = AdcortexChatClient(SESSION, api_key="k", rate_limit=0.001, rate_limit_burst=1, relevance_gate=gate)
+    client._transport = InMemoryTransport(api)
+    for i in range(3):
+        client(Role.user, f"looking for a laptop {i}")
+
+    assert len(requests) == 1
+    assert client.get_relevance_stats() == {"fetched": 1, "skipped": 0}
+
+
+def test_gate_rejections_count_as_skipped() -> None:
+    client = AdcortexChatClient(SESSION, api_key="k", relevance_gate=HeuristicRelevanceGate())
+    client._transport = InMemoryTransport(lambda request: RawResponse(500))
+    client(Role.user, "ok")
+
+    assert client.get_relevance_stats() == {"fetched": 0, "skipped": 1}
+
+
+def test_shared_gate_learns_from_concurrent_outcomes() -> None:
+    gate = HeuristicRelevanceGate(min_observations=1)
+    messages = [QueuedMessage.create(Role.user, "tell me more")]
+
+    def learn() -> None:
+        for _ in range(1000):
+            gate.record_outcome(messages, had_ad=False)
+            gate.record_fetch()
+
+    threads = [threading.Thread(target=learn) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert gate._outcomes["tell me more"] == [4000, 4000]
+    assert gate.get_stats()["fetched"] == 4000
+    assert not gate.should_fetch(messages, SESSION)
@@ -0,0 +1,129 @@
+"""Admission order and load shedding of the async fetch scheduler."""
+import asyncio
+from typing import Awaitable, Callable, List
+
+import pytest
+
+from adcortex.scheduler import FetchScheduler, FetchShed
+
+
+def _run(coro_fn: Callable[[], Awaitable[None]]) -> None:
+    asyncio.run(coro_fn())
+
+
+async def _settle() -> None:
+    # Let queued tasks reach their await points
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def _waiter(scheduler: FetchScheduler, priority: int, admitted: List[str], name: str) -> "asyncio.Task[None]":
+    async def wait() -> None:
+        await scheduler.acquire(priority)
+        admitted.append(name)
+
+    return asyncio.get_running_loop().create_task(wait())
+
+
+def test_admits_higher_priority_first_and_fifo_within_a_class() -> None:
+    async def scenario() -> None:
+        scheduler = FetchScheduler(max_in_flight=1)
+        await scheduler.acquire(0)
+        admitted: List[str] = []
+        tasks = [
+            _waiter(scheduler, 0, admitted, "low-1"),
+            _waiter(scheduler, 5, admitted, "high-1"),
+            _waiter(scheduler, 0, admitted, "low-2"),
+            _waiter(scheduler, 5, admitted, "high-2"),
+        ]
+        await _settle()
+        for _ in tasks:
+            scheduler.release()
+            await _settle()
+        assert admitted == ["high-1", "high-2", "low-1", "low-2"]
+        scheduler.release()
+        assert scheduler.get_stats()["in_flight"] == 0
+
+    _run(scenario)
+
+
+def test_equal_priority_newcomer_sheds_the_oldest_waiter() -> None:
+    async def scenario() -> None:
+        scheduler = FetchScheduler(max_in_flight=1, max_queue_size=2)
+        await scheduler.acquire(0)
+        admitted: List[str] = []
+        oldest = _waiter(scheduler, 0, admitted, "oldest")
+        _waiter(scheduler, 0, admitted, "middle")
+        await _settle()
+        newest = _waiter(scheduler, 0, admitted, "newest")
+        await _settle()
+
+        with pytest.raises(FetchShed):
+            await oldest
+        assert not newest.done()
+        assert scheduler.get_stats()["queued"] == 2
+        for _ in range(2):
+            scheduler.release()
+            await _settle()
+        assert admitted == ["middle", "newest"]
+
+    _run(scenario)
+
+
+def test_lower_priority_newcomer_is_shed_itself() -> None:
+    async def scenario() -> None:
+        scheduler = FetchScheduler(max_in_flight=1, max_queue_size=1)
+        await scheduler.acquire(0)
+        admitted: List[str] = []
+        queued = _waiter(scheduler, 5, admitted, "queued")
+        await _settle()
+
+        with pytest.raises(FetchShed):
+            await scheduler.acquire(1)
+        assert not queued.done()
+        assert scheduler.get_stats()["shed"] == 1
+        scheduler.release()
+        await _settle()
+        assert admitted == ["queued"]
+
+    _run(scenario)
+
+
+def test_cancelled_waiter_passes_on_a_slot_handed_to_it() -> None:
+    async def scenario() -> None:
+        scheduler = FetchScheduler(max_in_flight=1)
+        await scheduler.acquire(0)
+        admitted: List[str] = []
+        cancelled = _waiter(scheduler, 0, admitted, "cancelled")
+        _waiter(scheduler, 0, admitted, "next")
+        await _settle()
+
+        # The slot is handed over, then the waiter is cancelled before it resumes
+        scheduler.release()
+        cancelled.cancel()
+        await _settle()
+
+        assert cancelled.cancelled()
+        assert admitted == ["next"]
+        assert scheduler.get_stats()["in_flight"] == 1
+        scheduler.release()
+        assert scheduler.get_stats()["in_flight"] == 0
+
+    _run(scenario)
+
+
+def test_cancelled_waiter_leaves_the_queue() -> None:
+    async def scenario() -> None:
+        scheduler = FetchScheduler(max_in_flight=1)
+        await scheduler.acquire(0)
+        admitted: List[str] = []
+        waiter = _waiter(scheduler, 0, admitted, "waiter")
+        await _settle()
+        waiter.cancel()
+        await _settle()
+
+        assert scheduler.get_stats()["queued"] == 0
+        scheduler.release()
+        assert scheduler.get_stats()["in_flight"] == 0
+
+    _run(scenario)
@@ -0,0 +1,108 @@
+"""Breaker and rate limiter state shared across forked worker processes."""
+import os
+from typing import Callable
+
+import pytest
+
+pytest.importorskip("fcntl")
+
+from adcortex import shared_state  # noqa: E402
+from adcortex.shared_state import SharedCircuitBreaker, SharedRateLimiter  # noqa: E402
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+
+
+def _fork(target: Callable[[], None]) -> int:
+    """Run ``target`` in a forked process; it exits non-zero if ``target`` raised."""
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            target()
+            code = 0
+        finally:
+            os._exit(code)
+    return pid
+
+
+def _wait(pid: int) -> None:
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+
+def _in_child(target: Callable[[], None]) -> None:
+    _wait(_fork(target))
+
+
+def test_breaker_tripped_in_a_child_is_open_in_the_parent(tmp_path) -> None:
+    path = str(tmp_path / "breaker.state")
+    breaker = SharedCircuitBreaker(path, threshold=2, disable_logging=True)
+    breaker.record_error()
+    assert not breaker.is_open()
+
+    def trip() -> None:
+        SharedCircuitBreaker(path, threshold=2, disable_logging=True).record_error()
+
+    _in_child(trip)
+
+    assert breaker.is_open()
+    breaker.reset()
+    assert not breaker.is_open()
+    breaker.close()
+
+
+def test_concurrent_errors_from_many_processes_all_count(tmp_path) -> None:
+    path = str(tmp_path / "breaker.state")
+    # Opened before forking, so the children inherit the parent's record
+    breaker = SharedCircuitBreaker(path, threshold=10000, disable_logging=True)
+
+    def record_errors() -> None:
+        child = SharedCircuitBreaker(path, threshold=10000, disable_logging=True)
+        for _ in range(500):
+            child.record_error()
+
+    pids = [_fork(record_errors) for _ in range(3)]
+    for _ in range(500):
+        breaker.record_error()
+    for pid in pids:
+        _wait(pid)
+
+    with breaker._record.locked():
+        error_count, _ = breaker._record.read()
+    assert error_count == 2000
+    breaker.close()
+
+
+def test_rate_limit_budget_is_shared_with_a_child(tmp_path) -> None:
+    path = str(tmp_path / "limiter.state")
+    limiter = SharedRateLimiter(path, rate=0.001, burst=3)
+    assert limiter.try_acquire()
+
+    def take_the_rest() -> None:
+        child = SharedRateLimiter(path, rate=0.001, burst=3)
+        assert child.try_acquire()
+        assert child.try_acquire()
+        assert not child.try_acquire()
+
+    _in_child(take_the_rest)
+
+    assert not limiter.try_acquire()
+    limiter.close()
+
+
+def test_state_file_is_closed_with_its_last_user(tmp_path) -> None:
+    path = str(tmp_path / "breaker.state")
+    first = SharedCircuitBreaker(path)
+    second = SharedCircuitBreaker(path)
+    assert first._record is second._record
+    assert len(shared_state._records) == 1
+
+    first.close()
+    first.close()
+    assert len(shared_state._records) == 1
+    second.close()
+    assert shared_state._records == {}
+
+    # Garbage collection releases a reference too
+    SharedCircuitBreaker(path)
+    assert shared_state._records == {}
@@ -0,0 +1,106 @@
+"""Single in-flight fetch and follow-up batches of the thread-safe client."""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List
+
+import httpx
+import pytest
+from tenacity import wait_none
+
+from adcortex.chat_client import AdcortexChatClient
+from adcortex.core import PreparedRequest, RawResponse
+from adcortex.state import ClientState
+from adcortex.threadsafe_chat_client import ThreadSafeAdcortexChatClient
+from adcortex.transports import InMemoryTransport
+from adcortex.types import Role, SessionInfo, UserInfo
+
+SESSION = SessionInfo(
+    session_id="s",
+    character_name="c",
+    character_metadata="m",
+    user_info=UserInfo(user_id="u", age=30, gender="male", location="US", language="en", interests=["technology"]),
+    platform={"name": "p"},
+)
+
+
+class _BlockingApi:
+    """Ad endpoint that holds each request until released and records its batch."""
+
+    def __init__(self) -> None:
+        self.batches: List[List[str]] = []
+        self.started = threading.Semaphore(0)
+        self.release = threading.Event()
+
+    def __call__(self, request: PreparedRequest) -> RawResponse:
+        self.batches.append([message["content"] for message in json.loads(request.body)["messages"]])
+        self.started.release()
+        assert self.release.wait(timeout=5)
+        return RawResponse(200, json.dumps({"ads": []}).encode())
+
+
+@pytest.fixture
+def executor() -> Iterator[ThreadPoolExecutor]:
+    pool = ThreadPoolExecutor(max_workers=4)
+    yield pool
+    pool.shutdown(wait=True)
+
+
+@pytest.fixture(autouse=True)
+def no_retry_wait() -> Iterator[None]:
+    retrying = AdcortexChatClient._fetch_ad_batch.retry
+    wait = retrying.wait
+    retrying.wait = wait_none()
+    yield
+    retrying.wait = wait
+
+
+def test_turns_during_a_fetch_share_one_follow_up(executor: ThreadPoolExecutor) -> None:
+    api = _BlockingApi()
+    client = ThreadSafeAdcortexChatClient(SESSION, api_key="k", transport=InMemoryTransport(api), executor=executor)
+
+    first = client.submit(Role.user, "looking for a laptop")
+    assert api.started.acquire(timeout=5)
+    second = client.submit(Role.user, "with a big screen")
+    client.submit(Role.ai, "Sure")
+    third = client.submit(Role.user, "and long battery life")
+    assert second is third
+    assert not third.done()
+
+    api.release.set()
+    first.result(timeout=5)
+    third.result(timeout=5)
+
+    assert api.batches == [
+        ["looking for a laptop"],
+        ["with a big screen", "Sure", "and long battery life"],
+    ]
+    assert client.get_state() == ClientState.IDLE
+    assert len(client._message_queue) == 0
+
+
+def test_call_queues_without_returning_a_future(executor: ThreadPoolExecutor) -> None:
+    api = _BlockingApi()
+    api.release.set()
+    client = ThreadSafeAdcortexChatClient(SESSION, api_key="k", transport=InMemoryTransport(api), executor=executor)
+
+    assert client(Role.user, "looking for a laptop") is None
+    assert api.started.acquire(timeout=5)
+    assert client.submit(Role.ai, "Here are some").done()
+
+
+def test_failed_fetch_does_not_loop(executor: ThreadPoolExecutor) -> None:
+    attempts: List[PreparedRequest] = []
+
+    def api(request: PreparedRequest) -> RawResponse:
+        attempts.append(request)
+        raise httpx.ConnectError("refused")
+
+    client = ThreadSafeAdcortexChatClient(SESSION, api_key="k", transport=InMemoryTransport(api), executor=executor)
+    client.submit(Role.user, "looking for a laptop").result(timeout=5)
+
+    # One turn: three attempts, one breaker error, and the messages wait for the next turn
+    assert len(attempts) == 3
+    assert client._circuit_breaker._error_count == 1
+    assert client.get_state() == ClientState.IDLE
+    assert len(client._message_queue) == 1